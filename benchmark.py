@@ -0,0 +1,246 @@
+# Benchmarks for the simulator
+"""
+Times the simulator on generated workloads of increasing size, for
+each workload shape in WORKLOADS, and writes the results as JSON, so
+runs from different commits can be compared.
+
+For every engine and workload size this reports:
+- seconds: wall time of the run
+- ticks_per_second: simulated clock ticks per second of wall time
+- processes_per_second: processes simulated per second of wall time
+- peak_memory_mb: peak memory allocated during the run, measured with
+    tracemalloc in a second, untimed run
+- phases: for the tick and event engines, the wall time and number of
+    calls of each loop phase and instrumented method, measured with
+    profiling.PhaseProfiler in a second, untimed run. --phase-report also
+    prints its report
+
+Usage:
+    python benchmark.py --sizes 1000,10000,100000 --output after.json
+    python benchmark.py --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import main as driver
+from event_engine import EventEngine
+from multicore import MultiCoreEngine
+from profiling import PhaseProfiler
+
+ENGINES = ("tick", "event", "multicore")
+
+# generate_process_table arguments for each workload shape
+WORKLOADS = {
+    # the homework defaults: short jobs arriving every 4 to 8 ticks
+    "homework": {},
+    # long jobs arriving rarely, where most ticks are quiet
+    "sparse": {"inter_arrival_distribution": "exponential",
+               "inter_arrival_params": {"mean": 400},
+               "service_distribution": "uniform",
+               "service_params": {"min": 50, "max": 500}},
+}
+
+
+def run_tick(workload, quantum_time, context_switch_time, profiler=None):
+    """
+    Runs the original tick by tick loop in main.main()
+    :param profiler:
+    Optional PhaseProfiler
+    :return:
+    The Log holding the results
+    """
+    driver.PROCESSES = list(workload)
+    driver.QUANTUM_TIME = quantum_time
+    driver.CONTEXT_SWITCH_TIME = context_switch_time
+    driver.EVENT_DRIVEN = False
+    # main() prints every entry, which isn't what we're timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        return driver.main(profiler)
+
+
+def run_event(workload, quantum_time, context_switch_time, profiler=None):
+    """
+    Runs the event driven engine
+    :param profiler:
+    Optional PhaseProfiler
+    :return:
+    The Log holding the results
+    """
+    return EventEngine(workload, quantum_time, context_switch_time, profiler=profiler).run()
+
+
+def run_multicore(workload, quantum_time, context_switch_time):
+    """
+    Runs the multi core engine with 4 cores and per core queues
+    :return:
+    The Log holding the results
+    """
+    engine = MultiCoreEngine(workload, 4, quantum_time, context_switch_time,
+                             queue_mode="per_core")
+    return engine.run()
+
+
+def measure(engine, workload_name, workload, quantum_time, context_switch_time, memory=True,
+            phase_report=False):
+    """
+    Benchmarks one engine on one workload
+    :param engine:
+    One of ENGINES
+    :param workload_name:
+    The name of the workload shape, from WORKLOADS
+    :param workload:
+    A ProcessTable
+    :param memory:
+    Whether to do the extra run that measures peak memory
+    :param phase_report:
+    Whether to print the PhaseProfiler report to stderr
+    :return:
+    A dict of results
+    """
+    runner = {"tick": run_tick, "event": run_event, "multicore": run_multicore}[engine]
+
+    start = time.perf_counter()
+    log = runner(workload, quantum_time, context_switch_time)
+    seconds = time.perf_counter() - start
+
+    result = {
+        "engine": engine,
+        "workload": workload_name,
+        "processes": len(workload),
+        "quantum": quantum_time,
+        "context_switch": context_switch_time,
+        "seconds": seconds,
+        "simulated_ticks": log.final_complete_time + 1,
+        "ticks_per_second": (log.final_complete_time + 1) / seconds,
+        "processes_per_second": len(workload) / seconds,
+    }
+
+    if engine in ("tick", "event"):
+        # phase timing adds overhead, so it gets its own run
+        profiler = PhaseProfiler()
+        runner(workload, quantum_time, context_switch_time, profiler)
+        result["phases"] = {name: {"seconds": profiler.times[name], "calls": profiler.calls[name]}
+                            for name in profiler.times}
+        if phase_report:
+            print("# " + engine + " " + workload_name + " " + str(len(workload)) + " processes",
+                  file=sys.stderr)
+            profiler.report(sys.stderr)
+
+    if memory:
+        tracemalloc.start()
+        runner(workload, quantum_time, context_switch_time)
+        result["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result
+
+
+def git_commit():
+    """
+    :return:
+    The current git commit hash, or None outside of a git checkout
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    Prints the speedup of each result over a baseline run
+    :param results:
+    The results of this run
+    :param baseline:
+    The results loaded from an earlier run
+    """
+    def key(result):
+        return (result["engine"], result["workload"], result["processes"],
+                result["quantum"], result["context_switch"])
+    previous = {key(result): result for result in baseline["results"]}
+    print("engine\tworkload\tprocesses\tseconds\tbaseline\tspeedup")
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        print(result["engine"] + "\t" + result["workload"] + "\t" + str(result["processes"]) + "\t"
+              + str(round(result["seconds"], 4)) + "\t" + str(round(old["seconds"], 4)) + "\t"
+              + str(round(old["seconds"] / result["seconds"], 2)) + "x")
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the simulator")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma separated workload sizes")
+    parser.add_argument("--engines", default=",".join(ENGINES),
+                        help="comma separated engines, from " + ", ".join(ENGINES))
+    parser.add_argument("--workloads", default=",".join(WORKLOADS),
+                        help="comma separated workload shapes, from " + ", ".join(WORKLOADS))
+    parser.add_argument("--tick-max-processes", type=int, default=10000,
+                        help="largest workload to run on the slow tick engine")
+    parser.add_argument("--quantum", type=int, default=15)
+    parser.add_argument("--context-switch", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the peak memory runs")
+    parser.add_argument("--phase-report", action="store_true",
+                        help="print the per phase profile of the tick and event engines")
+    parser.add_argument("--output", help="file to write the JSON results to")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    # imported here since it needs NumPy
+    from process_generator import generate_process_table
+
+    results = []
+    for workload_name in args.workloads.split(","):
+        if workload_name not in WORKLOADS:
+            parser.error("unknown workload: " + workload_name)
+        for size in [int(size) for size in args.sizes.split(",")]:
+            workload = generate_process_table(size, seed=args.seed, **WORKLOADS[workload_name])
+            for engine in args.engines.split(","):
+                if engine not in ENGINES:
+                    parser.error("unknown engine: " + engine)
+                if engine == "tick" and size > args.tick_max_processes:
+                    continue
+                result = measure(engine, workload_name, workload, args.quantum,
+                                 args.context_switch, memory=not args.no_memory,
+                                 phase_report=args.phase_report)
+                results.append(result)
+                print(engine + "\t" + workload_name + "\t" + str(size) + " processes\t"
+                      + str(round(result["seconds"], 4)) + " s\t"
+                      + str(int(result["ticks_per_second"])) + " ticks/s\t"
+                      + str(int(result["processes_per_second"])) + " processes/s"
+                      + ("\t" + str(round(result["peak_memory_mb"], 2)) + " MB"
+                         if "peak_memory_mb" in result else ""), file=sys.stderr)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.time(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# Batch command line runner
+"""
+Runs a batch of simulations and writes one structured result per job.
+
+A job is a workload plus a configuration. Workloads come from:
+- trace files written by trace_file.write_trace, --trace
+- CSV files with id, service_time and arrival_time columns, --csv
+- process_generator, --generate N, once per seed in --seeds
+
+Every workload is run under every combination of --quantum,
+--context-switch, --scheduler and --cores. Jobs can also be listed in a
+JSON Lines file, one object per line, with the same names as the
+options, e.g. {"trace": "a.trace", "quantum": 10, "scheduler": "srtf"}.
+Each job names exactly one workload, a file with an invalid job is
+rejected before anything runs.
+
+Results are written as JSON Lines, or as a CSV summary with
+--format csv, in the order the jobs were given. A job that fails gets
+an "error" field instead of results.
+
+Only what a run needs is imported: NumPy for --generate,
+multiprocessing for --workers above 1, the result cache for
+--cache-dir. A single small run starts about as fast as Python does.
+
+Usage:
+    python cli.py --trace big.trace --quantum 5:30:5 --context-switch 1 --workers 8
+    python cli.py --generate 10000 --seeds 0:9 --scheduler round_robin,srtf --format csv
+"""
+import argparse
+import json
+import sys
+
+SCHEDULERS = ("round_robin", "sjf", "srtf", "mlfq")
+FORMATS = ("jsonl", "csv")
+# every job has exactly one of these
+WORKLOAD_KEYS = ("trace", "csv", "generate")
+# CSV summary columns
+SUMMARY_FIELDS = ("workload", "quantum", "context_switch", "scheduler", "cores", "processes",
+                  "final_complete_time", "average_turnaround_time", "average_service_time",
+                  "p99_turnaround_time", "p99_total_wait", "error")
+# the options a job can set, with their defaults
+JOB_DEFAULTS = {"quantum": 15, "context_switch": 0, "scheduler": "round_robin", "cores": 1,
+                "queue_mode": "shared"}
+
+# workload description -> loaded workload, per process
+_workloads = {}
+# the result cache and whether to include per process records
+# set once per worker by init_worker
+_cache = None
+_records = False
+
+
+def init_worker(cache_dir, records):
+    """
+    Sets up a process to run jobs
+    :param cache_dir:
+    Directory of a result cache, or None
+    :param records:
+    Whether results include per process records
+    """
+    global _cache, _records
+    if cache_dir:
+        from result_cache import ResultCache
+        _cache = ResultCache(cache_dir)
+    _records = records
+
+
+def parse_values(text):
+    """
+    Parses a list of values given on the command line
+    :param text:
+    Comma separated values or inclusive ranges, where a range is
+    "start:stop" or "start:stop:step", e.g. "1,5:30:5"
+    :return:
+    A list of ints
+    """
+    values = []
+    for part in text.split(","):
+        if ":" in part:
+            bounds = [int(value) for value in part.split(":")]
+            step = bounds[2] if len(bounds) > 2 else 1
+            values.extend(range(bounds[0], bounds[1] + 1, step))
+        else:
+            values.append(int(part))
+    return values
+
+
+def check_values(parser, option, values, minimum):
+    """
+    Rejects command line values below a minimum with parser.error
+    :param parser:
+    The ArgumentParser
+    :param option:
+    The option's name, for the message
+    :param values:
+    The list parse_values gave
+    :param minimum:
+    The smallest allowed value
+    """
+    if values and min(values) < minimum:
+        parser.error(option + " values must be at least " + str(minimum))
+
+
+def workload_label(job):
+    """
+    :return:
+    A short description of a job's workload
+    """
+    if "trace" in job:
+        return job["trace"]
+    if "csv" in job:
+        return job["csv"]
+    if "generate" in job:
+        return "generate:" + str(job["generate"]) + ":" + str(job.get("seed", 0))
+    raise ValueError("A job needs one of " + ", ".join(WORKLOAD_KEYS))
+
+
+def read_csv_workload(path):
+    """
+    Reads a workload from a CSV file
+    :param path:
+    A file with id, service_time and arrival_time columns
+    :return:
+    A ProcessTable
+    """
+    import csv
+    from cpu_tools import ProcessTable
+    table = ProcessTable()
+    with open(path, newline="") as file:
+        for row in csv.DictReader(file):
+            table.add_process(int(row["id"]), int(row["service_time"]), int(row["arrival_time"]))
+    return table
+
+
+def load_workload(job):
+    """
+    Loads a job's workload, once per process
+    :param job:
+    A job dict
+    :return:
+    A ProcessTable or a TraceReader
+    """
+    label = workload_label(job)
+    if label not in _workloads:
+        if "trace" in job:
+            from trace_file import TraceReader
+            _workloads[label] = TraceReader(job["trace"])
+        elif "csv" in job:
+            _workloads[label] = read_csv_workload(job["csv"])
+        else:
+            # imported here since it needs NumPy
+            from process_generator import generate_process_table
+            _workloads[label] = generate_process_table(job["generate"], seed=job.get("seed", 0))
+    return _workloads[label]
+
+
+def make_scheduler(name, quantum=15):
+    """
+    Builds a scheduler by name
+    :param name:
+    One of SCHEDULERS
+    :param quantum:
+    The job's quantum, mlfq uses it for its top level and doubles it per level
+    :return:
+    A scheduler, or None for the default round robin
+    """
+    from cpu_tools import ShortestJobFirst, ShortestRemainingTimeFirst, MultiLevelFeedbackQueue
+    if name == "round_robin":
+        return None
+    if name == "sjf":
+        return ShortestJobFirst()
+    if name == "srtf":
+        return ShortestRemainingTimeFirst()
+    if name == "mlfq":
+        # three levels, quantum doubling per level, boost every 100 quanta
+        return MultiLevelFeedbackQueue((quantum, 2 * quantum, 4 * quantum), 100 * quantum)
+    raise ValueError("Unknown scheduler: " + str(name))
+
+
+def run_job(job):
+    """
+    Runs one job
+    :param job:
+    A job dict
+    :return:
+    A dict of the job's settings and its results, or an error
+    """
+    from simulation import Simulation, check_settings
+    settings = dict(JOB_DEFAULTS)
+    settings.update((key, job[key]) for key in JOB_DEFAULTS if key in job)
+    output = {"workload": None}
+    output.update(settings)
+    try:
+        output["workload"] = workload_label(job)
+        # bad settings from a jobs file never reach the engine
+        check_settings(settings["quantum"], settings["context_switch"], settings["cores"])
+        simulation = Simulation(load_workload(job), settings["quantum"],
+                                settings["context_switch"],
+                                scheduler=make_scheduler(settings["scheduler"],
+                                                         settings["quantum"]),
+                                cores=settings["cores"], queue_mode=settings["queue_mode"],
+                                retire_entries=not _records)
+        if _cache is None:
+            result = simulation.run()
+        else:
+            result = _cache.run(simulation)
+    except (OSError, ValueError, KeyError) as error:
+        output["error"] = str(error)
+        return output
+    output.update(result.to_dict(_records))
+    return output
+
+
+def read_jobs(path):
+    """
+    Reads extra jobs from a JSON Lines file
+    :param path:
+    A file with one job object per line, blank lines are skipped
+    :return:
+    A list of job dicts
+    """
+    jobs = []
+    with open(path) as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            where = str(path) + " line " + str(line_number)
+            try:
+                job = json.loads(line)
+            except ValueError as error:
+                raise ValueError(where + ": " + str(error))
+            if not isinstance(job, dict):
+                raise ValueError(where + ": a job must be a JSON object")
+            if sum(key in job for key in WORKLOAD_KEYS) != 1:
+                raise ValueError(where + ": a job needs exactly one of "
+                                 + ", ".join(WORKLOAD_KEYS))
+            jobs.append(job)
+    return jobs
+
+
+def build_jobs(args):
+    """
+    Expands the command line options into jobs
+    :return:
+    A list of job dicts
+    Raises ValueError if the jobs file has an invalid job
+    """
+    workloads = [{"trace": path} for path in args.trace] + [{"csv": path} for path in args.csv]
+    for number in args.generate:
+        workloads += [{"generate": number, "seed": seed} for seed in args.seeds]
+    jobs = []
+    for workload in workloads:
+        for quantum in args.quantum:
+            for context_switch in args.context_switch:
+                for scheduler in args.scheduler:
+                    for cores in args.cores:
+                        job = dict(workload)
+                        job.update(quantum=quantum, context_switch=context_switch,
+                                   scheduler=scheduler, cores=cores)
+                        jobs.append(job)
+    if args.jobs:
+        jobs += read_jobs(args.jobs)
+    return jobs
+
+
+def write_csv_summary(results, file):
+    """
+    Writes one summary row per job
+    :param results:
+    An iterable of run_job outputs
+    :param file:
+    A text file
+    """
+    import csv
+    writer = csv.writer(file)
+    writer.writerow(SUMMARY_FIELDS)
+    for output in results:
+        percentiles = output.get("percentiles", {})
+        row = dict(output)
+        row["p99_turnaround_time"] = percentiles.get("turnaround_time", {}).get(99)
+        row["p99_total_wait"] = percentiles.get("total_wait", {}).get(99)
+        writer.writerow([row.get(field, "") for field in SUMMARY_FIELDS])
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :return:
+    The exit status, 1 if any job failed
+    """
+    parser = argparse.ArgumentParser(description="Run a batch of scheduling simulations")
+    parser.add_argument("--trace", action="append", default=[],
+                        help="binary trace file, can be repeated")
+    parser.add_argument("--csv", action="append", default=[],
+                        help="CSV workload with id, service_time and arrival_time, can be repeated")
+    parser.add_argument("--generate", type=int, action="append", default=[],
+                        help="generate a workload of this many processes, can be repeated")
+    parser.add_argument("--seeds", type=parse_values, default=[0],
+                        help="seeds for generated workloads, e.g. 0:9")
+    parser.add_argument("--jobs", help="JSON Lines file of extra jobs")
+    parser.add_argument("--quantum", type=parse_values, default=[15],
+                        help="quantum lengths, e.g. 5,10 or 5:30:5")
+    parser.add_argument("--context-switch", type=parse_values, default=[0],
+                        help="context switch times, e.g. 0,1")
+    parser.add_argument("--scheduler", type=lambda text: text.split(","), default=["round_robin"],
+                        help="comma separated schedulers, from " + ", ".join(SCHEDULERS))
+    parser.add_argument("--cores", type=parse_values, default=[1],
+                        help="numbers of CPU cores")
+    parser.add_argument("--records", action="store_true",
+                        help="include per process records in JSON output")
+    parser.add_argument("--format", default="jsonl", choices=FORMATS)
+    parser.add_argument("--output", help="file to write results to, default stdout")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes")
+    parser.add_argument("--cache-dir", default=None,
+                        help="directory to cache results in, default no caching")
+    args = parser.parse_args(argv)
+
+    check_values(parser, "--quantum", args.quantum, 1)
+    check_values(parser, "--context-switch", args.context_switch, 0)
+    check_values(parser, "--cores", args.cores, 1)
+    try:
+        jobs = build_jobs(args)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if not jobs:
+        parser.error("no workloads given, use --trace, --csv, --generate or --jobs")
+
+    if args.workers > 1:
+        from multiprocessing import Pool
+        pool = Pool(args.workers, initializer=init_worker, initargs=(args.cache_dir, args.records))
+        results = pool.imap(run_job, jobs)
+    else:
+        pool = None
+        init_worker(args.cache_dir, args.records)
+        results = map(run_job, jobs)
+
+    file = open(args.output, "w", newline="") if args.output else sys.stdout
+    failed = False
+    try:
+        if args.format == "csv":
+            results = list(results)
+            write_csv_summary(results, file)
+            failed = any("error" in output for output in results)
+        else:
+            for output in results:
+                file.write(json.dumps(output) + "\n")
+                failed = failed or "error" in output
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if file is not sys.stdout:
+            file.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
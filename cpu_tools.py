@@ -1,4 +1,9 @@
 # various classes used to model CPU and related concepts
+import heapq
+from array import array
+from collections import deque
+
+
 class Process:
     """
     Process Class
@@ -6,6 +11,9 @@ class Process:
     Here, the class holds an id, service time,
     and arrival time
     """
+    # no per instance __dict__, there can be millions of these
+    __slots__ = ("id", "service_time", "arrival_time")
+
     def __init__(self, id, service_time, arrival_time):
         self.id = id
         self.service_time = service_time
@@ -31,6 +39,182 @@ class Process:
         elif self.service_time == 0:
             return "terminated"
 
+    def copy(self):
+        """
+        :return:
+        A new process with the same id, service time and arrival time
+        """
+        return Process(self.id, self.service_time, self.arrival_time)
+
+
+class IOProcess(Process):
+    """
+    A process that alternates between CPU bursts and I/O bursts
+    service_time is what's left of the current CPU burst
+    Once a CPU burst is done the process blocks for the I/O burst
+    that follows it, and terminates after its last CPU burst
+    """
+    __slots__ = ("bursts", "burst_index")
+
+    def __init__(self, id, bursts, arrival_time):
+        """
+        Constructor for IOProcess
+        :param id:
+        The process id
+        :param bursts:
+        Burst lengths, alternating CPU and I/O, e.g. (5, 20, 3)
+        It starts and ends with a CPU burst
+        :param arrival_time:
+        The process' arrival time
+        """
+        if len(bursts) % 2 == 0:
+            raise ValueError("Process " + str(id) + " must start and end with a CPU burst")
+        if min(bursts[0::2]) < 1 or min(bursts) < 0:
+            raise ValueError("Process " + str(id) + " has an invalid burst length")
+        Process.__init__(self, id, bursts[0], arrival_time)
+        self.bursts = tuple(bursts)
+        # index of the current CPU burst in bursts
+        self.burst_index = 0
+
+    def get_state(self):
+        """"
+        returns process state info
+        :return:
+        the state of the process as a string
+            "running" if running
+            "blocked" if a CPU burst is done and I/O follows
+            "terminated" if the last CPU burst is done
+        """
+        if(self.service_time):
+            return "running"
+        elif self.burst_index + 1 < len(self.bursts):
+            return "blocked"
+        elif self.service_time == 0:
+            return "terminated"
+
+    def start_io(self):
+        """
+        Moves on to the I/O burst after the current CPU burst
+        and loads the CPU burst after that
+        :return:
+        How long the I/O burst takes
+        """
+        io_time = self.bursts[self.burst_index + 1]
+        self.burst_index += 2
+        self.service_time = self.bursts[self.burst_index]
+        return io_time
+
+    def copy(self):
+        """
+        :return:
+        A new process with the same bursts and arrival time,
+        starting from its first burst
+        """
+        return IOProcess(self.id, self.bursts, self.arrival_time)
+
+
+class ProcessTable:
+    """
+    Column oriented storage for a whole workload
+    Each column is a typed array, so a process that hasn't arrived yet
+    costs 24 bytes instead of a full Process object
+    Process objects are only built once a process is fed to the
+    ready queue
+    """
+    def __init__(self, ids=(), service_times=(), arrival_times=()):
+        """
+        Constructor for ProcessTable
+        :param ids:
+        An iterable of process ids
+        :param service_times:
+        An iterable of service times
+        :param arrival_times:
+        An iterable of arrival times
+        """
+        self.ids = array("q", ids)
+        self.service_times = array("q", service_times)
+        self.arrival_times = array("q", arrival_times)
+        if not len(self.ids) == len(self.service_times) == len(self.arrival_times):
+            raise ValueError("ProcessTable columns must all be the same length")
+
+    @classmethod
+    def from_processes(cls, processes):
+        """
+        Builds a table from Process objects
+        :param processes:
+        An iterable of processes
+        :return:
+        A new ProcessTable
+        """
+        table = cls()
+        for process in processes:
+            table.add_process(process.id, process.service_time, process.arrival_time)
+        return table
+
+    def add_process(self, id, service_time, arrival_time):
+        """
+        Appends a process to the table
+        :param id:
+        The process id
+        :param service_time:
+        The process' service time
+        :param arrival_time:
+        The process' arrival time
+        """
+        self.ids.append(id)
+        self.service_times.append(service_time)
+        self.arrival_times.append(arrival_time)
+
+    def sorted_by_arrival(self):
+        """
+        Gives the table sorted by arrival time
+        The sort is stable, so processes arriving together keep their order
+        :return:
+        This table if it's already sorted, a sorted copy otherwise
+        """
+        arrival_times = self.arrival_times
+        if all(arrival_times[i] <= arrival_times[i + 1] for i in range(len(arrival_times) - 1)):
+            return self
+        order = sorted(range(len(arrival_times)), key=arrival_times.__getitem__)
+        return ProcessTable((self.ids[i] for i in order),
+                            (self.service_times[i] for i in order),
+                            (arrival_times[i] for i in order))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        """
+        Builds the Process stored in a row
+        :param index:
+        The row to read
+        :return:
+        A new Process object
+        """
+        return Process(self.ids[index], self.service_times[index], self.arrival_times[index])
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self[index]
+
+
+"""
+------------------
+SCHEDULERS
+------------------
+A scheduler decides which process runs next and when to preempt
+Every scheduler provides:
+- make_ready_queue(): builds the ready queue the scheduler selects from
+    processes are added with appendleft and the next one to run is
+    taken with pop, just like the deque round robin uses
+- switch_process(clock_time, active_process, ready_queue):
+    True if the active process should be switched out now
+- next_switch_time(clock_time, active_process, ready_queue):
+    the earliest clock time switch_process could return True, or change
+    the scheduler's own state, if nothing else changes, or None if it
+    never would
+    this lets the event engine skip the ticks in between
+"""
 
 class RoundRobin:
     def __init__(self, quantum=15):
@@ -41,11 +225,22 @@ class RoundRobin:
         """
         self.quantum = quantum
 
-    def switch_process(self, clock_time):
+    def make_ready_queue(self):
+        """
+        :return:
+        A FIFO ready queue
+        """
+        return deque()
+
+    def switch_process(self, clock_time, active_process=None, ready_queue=None):
         """
         This computes the time to fire the timer interrupt
         :param clock_time:
         the current clock tum
+        :param active_process:
+        Unused, the timer doesn't care what is running
+        :param ready_queue:
+        Unused, the timer doesn't care what is waiting
         :return:
         True if it's time to switch processes
         False otherwise
@@ -56,6 +251,360 @@ class RoundRobin:
             return True
         return False
 
+    def next_switch_time(self, clock_time, active_process, ready_queue):
+        """
+        Finds the next timer interrupt
+        It only matters if there is something to switch to
+        :return:
+        The next multiple of the quantum, or None if nothing is waiting
+        """
+        if not ready_queue:
+            return None
+        return -(-clock_time // self.quantum) * self.quantum
+
+
+class PriorityReadyQueue:
+    """
+    Ready queue that always gives back the process with the least
+    remaining service time, using a binary heap
+    Processes with the same service time come out in the order they
+    were added
+    It has the same interface as the deque used for round robin
+    """
+    def __init__(self):
+        self.heap = []
+        # insertion counter, breaks ties in FIFO order
+        self.count = 0
+
+    def appendleft(self, process):
+        """
+        Adds a process, O(log n)
+        """
+        heapq.heappush(self.heap, (process.service_time, self.count, process))
+        self.count += 1
+
+    def pop(self):
+        """
+        Removes and returns the shortest process, O(log n)
+        """
+        return heapq.heappop(self.heap)[2]
+
+    # a heap has no back end, so stealing takes the shortest process too
+    popleft = pop
+
+    def peek(self):
+        """
+        :return:
+        The shortest process without removing it
+        """
+        return self.heap[0][2]
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __iter__(self):
+        # heap order, not selection order
+        return (item[2] for item in self.heap)
+
+
+class ShortestJobFirst:
+    """
+    Non preemptive shortest job first
+    A process runs until it terminates, then the waiting process with
+    the least service time runs next
+    """
+    def make_ready_queue(self):
+        """
+        :return:
+        A ready queue ordered by service time
+        """
+        return PriorityReadyQueue()
+
+    def switch_process(self, clock_time, active_process=None, ready_queue=None):
+        """
+        Never preempts
+        """
+        return False
+
+    def next_switch_time(self, clock_time, active_process, ready_queue):
+        """
+        Never preempts
+        """
+        return None
+
+
+class ShortestRemainingTimeFirst(ShortestJobFirst):
+    """
+    Preemptive shortest remaining time first
+    The active process is switched out as soon as a waiting process
+    needs less time to finish than it does
+    """
+    def switch_process(self, clock_time, active_process=None, ready_queue=None):
+        """
+        Checks the shortest waiting process against the active one
+        :param clock_time:
+        the current clock time
+        :param active_process:
+        The process on the CPU
+        :param ready_queue:
+        The scheduler's ready queue
+        :return:
+        True if a waiting process has less remaining time
+        False otherwise
+        """
+        return bool(ready_queue) and active_process is not None \
+            and ready_queue.peek().service_time < active_process.service_time
+
+    def next_switch_time(self, clock_time, active_process, ready_queue):
+        """
+        The active process only gets shorter while it runs, so if it
+        shouldn't be preempted now it won't be until something arrives
+        :return:
+        clock_time if a switch is due now, None otherwise
+        """
+        if self.switch_process(clock_time, active_process, ready_queue):
+            return clock_time
+        return None
+
+
+class MultiLevelReadyQueue:
+    """
+    Ready queue with one FIFO deque per priority level, level 0 first
+    A bitmap with bit n set while level n is non-empty finds the highest
+    non-empty level with one bit trick, O(1) however many levels or
+    processes there are
+    It has the same interface as the deque used for round robin
+    """
+    def __init__(self, scheduler):
+        """
+        Constructor for MultiLevelReadyQueue
+        :param scheduler:
+        The MultiLevelFeedbackQueue that keeps each process's level
+        """
+        self.scheduler = scheduler
+        self.levels = [deque() for level in scheduler.quanta]
+        self.bitmap = 0
+        self.count = 0
+
+    def highest_level(self):
+        """
+        :return:
+        The highest priority non-empty level, None if the queue is empty
+        """
+        if not self.bitmap:
+            return None
+        # the lowest set bit
+        return (self.bitmap & -self.bitmap).bit_length() - 1
+
+    def appendleft(self, process):
+        """
+        Adds a process to the back of its level, O(1)
+        New processes start at level 0
+        """
+        level = self.scheduler.get_level(process)
+        self.levels[level].appendleft(process)
+        self.bitmap |= 1 << level
+        self.count += 1
+
+    def pop(self):
+        """
+        Removes and returns the oldest process of the highest non-empty
+        level, O(1), and starts its quantum
+        """
+        level = self.highest_level()
+        if level is None:
+            raise IndexError("pop from an empty ready queue")
+        queue = self.levels[level]
+        process = queue.pop()
+        if not queue:
+            self.bitmap &= ~(1 << level)
+        self.count -= 1
+        self.scheduler.dispatch(process)
+        return process
+
+    def popleft(self):
+        """
+        Removes and returns the newest process of the lowest priority
+        non-empty level, the one least likely to run soon here
+        Used for work stealing
+        """
+        if not self.bitmap:
+            raise IndexError("pop from an empty ready queue")
+        level = self.bitmap.bit_length() - 1
+        queue = self.levels[level]
+        process = queue.popleft()
+        if not queue:
+            self.bitmap &= ~(1 << level)
+        self.count -= 1
+        self.scheduler.dispatch(process)
+        return process
+
+    def peek(self):
+        """
+        :return:
+        The process pop would return, without removing it
+        """
+        level = self.highest_level()
+        if level is None:
+            raise IndexError("peek at an empty ready queue")
+        return self.levels[level][-1]
+
+    def boost(self):
+        """
+        Moves every waiting process to level 0, higher levels first
+        """
+        top = self.levels[0]
+        for queue in self.levels[1:]:
+            while queue:
+                top.appendleft(queue.pop())
+        self.bitmap = 1 if top else 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # selection order
+        for queue in self.levels:
+            yield from reversed(queue)
+
+
+class MultiLevelFeedbackQueue:
+    """
+    Preemptive multi-level feedback queue
+    - new processes start at level 0, the highest priority
+    - the oldest process of the highest non-empty level runs next
+    - a process that uses up its level's quantum is demoted one level
+    - a process that gives up the CPU before that, by blocking on I/O or
+        being preempted, keeps its level
+    - a process is preempted as soon as a higher level has a process
+    - every boost_interval ticks every process goes back to level 0, so
+        long jobs at the bottom can't starve
+    It keeps per run state, so use a new one for each engine
+    """
+    def __init__(self, quanta=(8, 16, 32), boost_interval=1000):
+        """
+        Constructor for the MultiLevelFeedbackQueue scheduler
+        :param quanta:
+        The quantum of each level, highest priority first
+        Its length is the number of levels
+        :param boost_interval:
+        How often every process goes back to level 0
+        None or 0 to never boost
+        """
+        if not quanta or min(quanta) < 1:
+            raise ValueError("Every level needs a quantum of at least 1")
+        self.quanta = tuple(quanta)
+        self.boost_interval = boost_interval
+        self.next_boost_time = boost_interval if boost_interval else None
+        # pid -> [process, level, service time when dispatched]
+        #   for processes that have been dispatched
+        self.dispatched = {}
+        # terminated processes are dropped once there are this many
+        self.sweep_size = 64
+        # every ready queue made, boosts reach all of them
+        self.ready_queues = []
+
+    def make_ready_queue(self):
+        """
+        :return:
+        A ready queue with one FIFO per level
+        """
+        ready_queue = MultiLevelReadyQueue(self)
+        self.ready_queues.append(ready_queue)
+        return ready_queue
+
+    def get_level(self, process):
+        """
+        :return:
+        The level of a process, 0 if it was never dispatched
+        """
+        state = self.dispatched.get(process.id)
+        return 0 if state is None else state[1]
+
+    def dispatch(self, process):
+        """
+        Starts a new quantum for a process taken from a ready queue
+        """
+        state = self.dispatched.get(process.id)
+        if state is None:
+            self.dispatched[process.id] = [process, 0, process.service_time]
+            if len(self.dispatched) > self.sweep_size:
+                self.sweep()
+        else:
+            state[2] = process.service_time
+
+    def sweep(self):
+        """
+        Forgets processes that have terminated
+        """
+        self.dispatched = {pid: state for pid, state in self.dispatched.items()
+                           if state[0].service_time > 0}
+        self.sweep_size = max(64, 2 * len(self.dispatched))
+
+    def boost(self, clock_time):
+        """
+        Moves every process to level 0 if a boost is due
+        Every process starts a fresh quantum there, so a running process
+        isn't demoted again for time it used before the boost
+        :param clock_time:
+        the current clock time
+        """
+        if self.next_boost_time is None or clock_time < self.next_boost_time:
+            return
+        for state in self.dispatched.values():
+            state[1] = 0
+            state[2] = state[0].service_time
+        for ready_queue in self.ready_queues:
+            ready_queue.boost()
+        self.next_boost_time = (clock_time // self.boost_interval + 1) * self.boost_interval
+
+    def switch_process(self, clock_time, active_process=None, ready_queue=None):
+        """
+        Boosts if due, then checks the active process against its level
+        Demotes it if its quantum is used up
+        :param clock_time:
+        the current clock time
+        :param active_process:
+        The process on the CPU
+        :param ready_queue:
+        The scheduler's ready queue
+        :return:
+        True if a higher level has a process, or the active process used
+        up its quantum and something is waiting
+        False otherwise
+        """
+        self.boost(clock_time)
+        if active_process is None:
+            return False
+        state = self.dispatched[active_process.id]
+        level = state[1]
+        if ready_queue.bitmap and ready_queue.highest_level() < level:
+            return True
+        if state[2] - active_process.service_time >= self.quanta[level]:
+            state[1] = min(level + 1, len(self.quanta) - 1)
+            # if nothing is waiting it keeps running with a new quantum
+            state[2] = active_process.service_time
+            return bool(ready_queue)
+        return False
+
+    def next_switch_time(self, clock_time, active_process, ready_queue):
+        """
+        Finds the next boost or quantum expiry
+        Both change levels, so they matter even if nothing is waiting
+        :return:
+        The earliest clock time switch_process has something to do
+        """
+        if self.next_boost_time is not None and clock_time >= self.next_boost_time:
+            return clock_time
+        state = self.dispatched[active_process.id]
+        level = state[1]
+        if ready_queue.bitmap and ready_queue.highest_level() < level:
+            return clock_time
+        expiry = clock_time + max(self.quanta[level] - (state[2] - active_process.service_time), 0)
+        if self.next_boost_time is not None:
+            return min(expiry, self.next_boost_time)
+        return expiry
+
 class CPU:
     """
     Represents a CPU
@@ -98,6 +647,10 @@ class CPU:
         #   switch so that it may be retrieved
         self.old_process = None
 
+        # this holds a process that just blocked on I/O
+        #   so that it may be retrieved
+        self.blocked_process = None
+
     def set_clock(self, clock_time):
         """
         feed the CPU the current clock time
@@ -114,6 +667,8 @@ class CPU:
     def execute_process(self):
         """
         Executes a process
+        A process that blocks on I/O leaves the CPU free, and can be
+        retrieved with retrieve_blocked_process
         :return:
         A completed process id if it has been terminated
         Or None otherwise
@@ -132,6 +687,12 @@ class CPU:
                 self.active_process = None
                 # return the old process's id
                 return old_process.id
+            elif state == "blocked":
+                # hold the process until it's parked
+                self.blocked_process = self.active_process
+                self.status = "free"
+                self.active_process = None
+                return None
             else:
                 return None
         else:
@@ -177,17 +738,44 @@ class CPU:
         else:
             return None
 
+    def retrieve_blocked_process(self):
+        """
+        Used to retrieve a process that blocked on I/O
+        during the last execute_process
+        :return:
+        The blocked process if there is one
+        Return None otherwise
+        """
+        blocked_process = self.blocked_process
+        self.blocked_process = None
+        return blocked_process
+
 class ProcessManager:
     def __init__(self, processes, ready_queue):
         """
         This manages the flow of processes to the ready queue
         :param processes:
-        A list of processes
+        A list of processes, or a column oriented workload such as
+        a ProcessTable or a trace_file.TraceReader
+        Neither is modified, processes in a list are copied since
+        they are executed in place
         :param ready_queue:
         A deque that represents the ready queue
         """
-        self.processes = processes
+        # pending processes are kept sorted by arrival time
+        # the sort is stable, so processes arriving together
+        # keep the order they were given in
+        if hasattr(processes, "arrival_times"):
+            # rows are only turned into Process objects as they arrive
+            self.processes = processes.sorted_by_arrival()
+            self.arrival_times = self.processes.arrival_times
+        else:
+            self.processes = sorted((process.copy() for process in processes),
+                                    key=lambda a: a.arrival_time)
+            self.arrival_times = [process.arrival_time for process in self.processes]
         self.ready_queue = ready_queue
+        # index of the next process to arrive
+        self.cursor = 0
 
     def feed_ready_queue(self, clock_time):
         """
@@ -195,18 +783,39 @@ class ProcessManager:
         arrival time, feed it into the ready queue
         :param clock_time:
         The current clock time
+        :return:
+        A list of the processes fed, in order of arrival
+        """
+        arrival_times = self.arrival_times
+        cursor = self.cursor
+        fed = []
+        # release every process that has arrived by now
+        # in the order they arrived
+        while cursor < len(arrival_times) and arrival_times[cursor] <= clock_time:
+            process = self.processes[cursor]
+            self.ready_queue.appendleft(process)
+            fed.append(process)
+            cursor += 1
+        self.cursor = cursor
+        return fed
+
+    def has_pending_processes(self):
+        """
+        Checks for processes that haven't arrived yet
+        :return:
+        True if some processes haven't been fed to the ready queue
+        False otherwise
         """
-        results = []
-        for process in self.processes:
-            # check for all processes with arrival
-            # time equal to process time
+        return self.cursor < len(self.arrival_times)
 
-            if process.arrival_time == clock_time:
-                # temporarily store the found processes in results
-                results.append(process)
+    def next_arrival_time(self):
+        """
+        Gives the arrival time of the next pending process
+        :return:
+        The earliest arrival time that hasn't been fed yet
+        None if every process has arrived
+        """
+        if self.cursor < len(self.arrival_times):
+            return self.arrival_times[self.cursor]
+        return None
 
-        # next, add the results to the ready queue
-        # and remove them from the process list
-        for process in results:
-            self.ready_queue.appendleft(process)
-            self.processes.remove(process)
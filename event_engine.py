@@ -0,0 +1,363 @@
+# Event driven version of the driver loop in main.py
+"""
+The driver loop in main.py advances the clock one tick at a time and
+runs every phase on every tick, even when nothing interesting can
+happen. Most of those ticks are "quiet": the CPU keeps executing the
+same process (or keeps context switching, or sits idle) and every
+process in the ready queue simply waits one more tick.
+
+EventEngine runs the exact same phases as main.main() on the ticks
+where something can change, and jumps over the quiet ticks in between.
+The interesting ticks are:
+- a process arrives
+- the active process executes its last unit of service time
+- the scheduler preempts, e.g. the round robin interrupt fires
+  while processes are waiting
+- a context switch completes
+- a process blocked on I/O wakes up
+
+Because every non-quiet tick is run exactly like the tick driver, the
+per process results are identical to the ones main.main() produces.
+
+------------------
+SNAPSHOTS
+------------------
+An engine can save its whole state between ticks and be rebuilt from
+it later, on the same or a modified workload. run() can take a snapshot
+every snapshot_interval ticks, and what_if() re-runs a modified
+workload from the last snapshot before the first changed arrival
+instead of starting again from the beginning.
+"""
+from bisect import bisect_right
+from cpu_tools import *
+from log import *
+from profiling import LOG_METHODS, CPU_METHODS, ENGINE_METHODS
+from timing_wheel import TimingWheel
+
+
+class Snapshot:
+    """
+    The state of an EventEngine between two ticks
+    The state is pickled, so restoring it never changes the snapshot
+    and it can be restored any number of times
+    """
+    def __init__(self, clock_time, state):
+        """
+        Constructor for Snapshot
+        :param clock_time:
+        The next tick the engine would have run
+        :param state:
+        The pickled engine state
+        """
+        self.clock_time = clock_time
+        self.state = state
+
+
+class EventEngine:
+    """
+    Event driven round robin simulation
+    holds all the state main.main() keeps in local variables
+    """
+    def __init__(self, processes, quantum_time=15, context_switch_time=0, clock_time=0,
+                 log=None, scheduler=None, profiler=None, timeline=None):
+        """
+        Constructor for the EventEngine
+        :param processes:
+        A list of processes or a ProcessTable
+        :param quantum_time:
+        The time quantum for the timer interrupt
+        :param context_switch_time:
+        How long a context switch will take
+        :param clock_time:
+        The starting clock time
+        :param log:
+        The Log to record results in
+        Default is a new Log
+        :param scheduler:
+        The scheduler to use, see cpu_tools
+        Default is RoundRobin(quantum_time)
+        :param profiler:
+        Optional profiling.PhaseProfiler
+        The loop phases and the Log, CPU and engine methods are timed
+        :param timeline:
+        Optional timeline.Timeline, records what the CPU does on every tick
+        """
+        # processes are added to the log as they arrive
+        self.log = log if log is not None else Log()
+        self.clock_time = clock_time
+        self.scheduler = scheduler if scheduler is not None else RoundRobin(quantum_time)
+        self.ready_queue = self.scheduler.make_ready_queue()
+        self.process_manager = ProcessManager(processes, self.ready_queue)
+        self.cpu = CPU(context_switch_time, clock_time)
+        # on deck is a process that is awaiting for
+        # a context switch to complete
+        self.on_deck = None
+        # processes blocked on I/O, until they wake up
+        self.blocked = TimingWheel(clock_time)
+        # flag indicating whether there are still processes
+        self.keep_processing = True
+        # snapshots taken by run(), oldest first
+        self.snapshots = []
+
+        self.timeline = timeline
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self.log, LOG_METHODS, "Log.")
+            profiler.instrument(self.cpu, CPU_METHODS, "CPU.")
+            profiler.instrument(self, ENGINE_METHODS, "EventEngine.")
+
+    def tick(self):
+        """
+        Runs a single clock tick
+        This is the body of the loop in main.main()
+        """
+        cpu = self.cpu
+        ready_queue = self.ready_queue
+        log = self.log
+        clock_time = self.clock_time
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start()
+
+        # 1. FEED PROCESSES
+        for process in self.process_manager.feed_ready_queue(clock_time):
+            log.add_entry(process.id, process.arrival_time)
+        # 1.1 WAKE PROCESSES WHOSE I/O IS DONE
+        if self.blocked:
+            for wake_time, process in self.blocked.advance(clock_time):
+                ready_queue.appendleft(process)
+                log.set_wake_time(process.id, wake_time)
+        if profiler is not None:
+            profiler.lap("1. feed")
+
+        # 2. GIVE CPU NEW CLOCK TIME
+        cpu.set_clock(clock_time)
+        if profiler is not None:
+            profiler.lap("2. set clock")
+
+        # 3. BOOKKEEPING PT 1
+        # 3.1 CLEAR ON_DECK IF PROCESSOR IS RUNNING
+        if cpu.status == "running":
+            if self.on_deck:
+                # the context switch is over, so on deck stops waiting
+                log.set_dispatch_time(self.on_deck.id, clock_time)
+            self.on_deck = None
+        if profiler is not None:
+            profiler.lap("3. bookkeeping")
+
+        # 4. CHECK IF A CONTEXT SWITCH IS APPROPRIATE
+        # 4.1 IF THIS IS THE FIRST PROCESS AND A FULL CS
+        #   ISN'T NEEDED
+        if cpu.first_process:
+            if ready_queue:
+                cpu.switch_process(ready_queue.pop())
+                # it waited this tick, but executes right away
+                log.set_dispatch_time(cpu.active_process.id, clock_time + 1)
+        # 4.2 IF THE PROCESSOR IS FREE
+        elif cpu.status == "free":
+            if ready_queue:
+                self.on_deck = ready_queue.pop()
+                cpu.switch_process(self.on_deck)
+        # 4.3 IF THE SCHEDULER WANTS TO PREEMPT
+        #   AND THE PROCESSOR ISN'T MID CS
+        elif cpu.status != "cs" \
+                and self.scheduler.switch_process(clock_time, cpu.active_process, ready_queue):
+            if ready_queue:
+                self.on_deck = ready_queue.pop()
+                cpu.switch_process(self.on_deck)
+        if profiler is not None:
+            profiler.lap("4. context switch decision")
+
+        # 5. EXECUTE PROCESS
+        if self.timeline is not None:
+            self.timeline.record_cpu(clock_time, clock_time + 1, cpu)
+        if cpu.status == "running":
+            log.unset_initial_wait_flag(cpu.active_process.id)
+            finished_process_id = cpu.execute_process()
+            # 5.1 IF THE PROCESS IS DONE EXECUTING
+            if finished_process_id is not None:
+                log.set_end_time(finished_process_id, clock_time)
+            # 5.2 IF THE PROCESS BLOCKED ON I/O
+            blocked_process = cpu.retrieve_blocked_process()
+            if blocked_process:
+                # blocked from the next tick until its I/O is done
+                log.set_block_time(blocked_process.id, clock_time + 1)
+                self.blocked.schedule(clock_time + blocked_process.start_io() + 1,
+                                      blocked_process)
+            if finished_process_id is not None or blocked_process is not None:
+                if ready_queue:
+                    # first try to immediately load a new process
+                    self.on_deck = ready_queue.pop()
+                    cpu.switch_process(self.on_deck)
+                else:
+                    cpu.status = "free"
+        if profiler is not None:
+            profiler.lap("5. execute")
+
+        # 6. RECOVER PROCESS FROM CPU AFTER CONTEXT SWITCH
+        old_process = cpu.retrieve_previous_process()
+        if old_process:
+            ready_queue.appendleft(old_process)
+            # it starts waiting again on the next tick
+            log.set_enqueue_time(old_process.id, clock_time + 1)
+        if profiler is not None:
+            profiler.lap("6. recover")
+
+        # 7. BOOKKEEPING PT 2
+        # 7.1 SIGNAL END OF DRIVER IF APPROPRIATE
+        if not ready_queue and not self.process_manager.has_pending_processes() \
+                and cpu.status == "free" and not cpu.old_process and not self.blocked:
+            self.keep_processing = False
+            log.final_complete_time = clock_time
+        # 7.2 INCREMENT CLOCKTIME
+        self.clock_time += 1
+        if profiler is not None:
+            profiler.lap("7. termination check")
+
+    def next_event_time(self):
+        """
+        Computes the next clock time where something other than
+        plain execution or waiting can happen
+        :return:
+        The clock time of the next tick that must be fully simulated
+        """
+        cpu = self.cpu
+        candidates = []
+
+        next_arrival = self.process_manager.next_arrival_time()
+        if next_arrival is not None:
+            candidates.append(next_arrival)
+
+        next_wake = self.blocked.next_expiry()
+        if next_wake is not None:
+            candidates.append(next_wake)
+
+        if cpu.status == "running":
+            # the tick where the active process executes its last unit
+            candidates.append(self.clock_time + cpu.active_process.service_time - 1)
+            # the next time the scheduler could preempt
+            switch_time = self.scheduler.next_switch_time(self.clock_time, cpu.active_process,
+                                                          self.ready_queue)
+            if switch_time is not None:
+                candidates.append(switch_time)
+        elif cpu.status == "cs":
+            # the tick where set_clock finishes the context switch
+            candidates.append(cpu.cs_start_time + cpu.cs)
+
+        if not candidates:
+            return self.clock_time
+        return max(min(candidates), self.clock_time)
+
+    def skip_to(self, event_time):
+        """
+        Applies every quiet tick before event_time in one step
+        :param event_time:
+        The clock time of the next tick that must be fully simulated
+        """
+        elapsed = event_time - self.clock_time
+        if elapsed <= 0:
+            return
+        if self.timeline is not None:
+            self.timeline.record_cpu(self.clock_time, event_time, self.cpu)
+
+        if self.cpu.status == "running":
+            # the active process executes once per quiet tick
+            self.cpu.active_process.service_time -= elapsed
+        # waiting processes don't need anything, the log charges
+        # them from their enqueue and dispatch times
+
+        self.cpu.clock_time = event_time - 1
+        self.clock_time = event_time
+
+    def snapshot(self):
+        """
+        Saves the state of the simulation
+        The workload isn't saved, only how far into it the engine is
+        The log's exporter isn't saved either
+        :return:
+        A Snapshot
+        """
+        # imported here so runs without snapshots start faster
+        import pickle
+        exporter = self.log.exporter
+        self.log.exporter = None
+        try:
+            state = pickle.dumps((self.cpu, self.ready_queue, self.on_deck, self.log,
+                                  self.scheduler, self.blocked, self.keep_processing),
+                                 pickle.HIGHEST_PROTOCOL)
+        finally:
+            self.log.exporter = exporter
+        return Snapshot(self.clock_time, state)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, processes):
+        """
+        Rebuilds an engine from a snapshot
+        :param snapshot:
+        A Snapshot
+        :param processes:
+        The workload to continue with
+        Every process arriving before the snapshot's clock time must be
+        the same as in the workload the snapshot was taken from
+        :return:
+        A new EventEngine, ready to run from the snapshot's clock time
+        """
+        import pickle
+        cpu, ready_queue, on_deck, log, scheduler, blocked, keep_processing = \
+            pickle.loads(snapshot.state)
+        # built with a stand-in scheduler, so the restored one doesn't make
+        #   a ready queue that the snapshot's would replace
+        #   (MultiLevelFeedbackQueue keeps every queue it makes)
+        engine = cls(processes, context_switch_time=cpu.cs, clock_time=snapshot.clock_time,
+                     log=log, scheduler=RoundRobin())
+        engine.scheduler = scheduler
+        engine.cpu = cpu
+        engine.ready_queue = ready_queue
+        engine.process_manager.ready_queue = ready_queue
+        engine.on_deck = on_deck
+        engine.blocked = blocked
+        engine.keep_processing = keep_processing
+        # everything that arrived before the snapshot is already in the state
+        engine.process_manager.cursor = bisect_right(engine.process_manager.arrival_times,
+                                                     snapshot.clock_time - 1)
+        return engine
+
+    def run(self, snapshot_interval=None):
+        """
+        Runs the simulation until every process has terminated
+        :param snapshot_interval:
+        If given, a snapshot is added to self.snapshots at the start and
+        then at the first tick after every snapshot_interval ticks
+        :return:
+        The Log holding the results
+        """
+        next_snapshot_time = self.clock_time
+        while self.keep_processing:
+            if snapshot_interval and self.clock_time >= next_snapshot_time:
+                self.snapshots.append(self.snapshot())
+                next_snapshot_time = (self.clock_time // snapshot_interval + 1) * snapshot_interval
+            self.tick()
+            if self.keep_processing:
+                self.skip_to(self.next_event_time())
+        return self.log
+
+
+def what_if(snapshots, processes, first_changed_arrival):
+    """
+    Simulates a modified workload, starting from the latest snapshot
+    that the modification doesn't affect
+    :param snapshots:
+    Snapshots of a run on the original workload, oldest first,
+    e.g. EventEngine.snapshots
+    :param processes:
+    The modified workload
+    :param first_changed_arrival:
+    The earliest arrival time of any process that was added, removed
+    or changed
+    :return:
+    The Log holding the results for the modified workload
+    """
+    usable = [snapshot for snapshot in snapshots if snapshot.clock_time <= first_changed_arrival]
+    if not usable:
+        raise ValueError("No snapshot was taken before " + str(first_changed_arrival))
+    return EventEngine.from_snapshot(usable[-1], processes).run()
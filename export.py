@@ -0,0 +1,97 @@
+# Streaming export of per process results
+"""
+Exporters write one record per process as soon as it terminates,
+instead of printing everything at the end of a run.
+Records are buffered and written in bulk every buffer_size records.
+
+Pass an exporter to Log, usually with retire_entries=True so finished
+entries don't stay in memory:
+
+    with open("results.csv", "w", newline="") as file:
+        exporter = CSVExporter(file)
+        log = Log(exporter, retire_entries=True)
+        EventEngine(processes, log=log).run()
+        log.flush()
+"""
+import csv
+import json
+
+# the fields of a record, in order
+FIELDS = ("pid", "start_time", "end_time", "interarrival_time",
+          "initial_wait", "total_wait", "turnaround_time", "blocked_time")
+
+
+class CSVExporter:
+    """
+    Writes per process records as CSV, with a header row
+    """
+    def __init__(self, file, buffer_size=10000):
+        """
+        Constructor for CSVExporter
+        :param file:
+        A text file opened for writing, with newline=""
+        :param buffer_size:
+        How many records to hold before writing them out
+        """
+        self.writer = csv.writer(file)
+        self.writer.writerow(FIELDS)
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def write_entry(self, entry):
+        """
+        Queues a finished Log entry to be written
+        :param entry:
+        A Log.Entry
+        """
+        self.buffer.append(entry.get_record())
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes every buffered record
+        """
+        self.writer.writerows(self.buffer)
+        self.buffer = []
+
+
+class JSONLinesExporter:
+    """
+    Writes per process records as JSON Lines, one object per line
+    """
+    def __init__(self, file, buffer_size=10000):
+        """
+        Constructor for JSONLinesExporter
+        :param file:
+        A text file opened for writing
+        :param buffer_size:
+        How many records to hold before writing them out
+        """
+        self.file = file
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def write_entry(self, entry):
+        """
+        Queues a finished Log entry to be written
+        :param entry:
+        A Log.Entry
+        """
+        self.buffer.append('{"pid": ' + json.dumps(entry.pid)
+                           + ', "start_time": ' + str(entry.start_time)
+                           + ', "end_time": ' + str(entry.end_time)
+                           + ', "interarrival_time": ' + str(entry.interarrival_time)
+                           + ', "initial_wait": ' + str(entry.initial_wait)
+                           + ', "total_wait": ' + str(entry.total_wait)
+                           + ', "turnaround_time": ' + str(entry.turnaround_time)
+                           + ', "blocked_time": ' + str(entry.blocked_time) + '}\n')
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes every buffered record
+        """
+        self.file.write("".join(self.buffer))
+        self.buffer = []
@@ -1,4 +1,5 @@
 # Class for logging CPU info
+from quantiles import Histogram, PERCENTILES
 
 class Log:
     """
@@ -6,8 +7,12 @@ class Log:
     holds all data needed to display final results
     """
     class Entry:
+        # no per instance __dict__, there is one entry per process
+        __slots__ = ("pid", "start_time", "calculate_initial_wait", "end_time",
+                     "interarrival_time", "initial_wait", "total_wait", "turnaround_time",
+                     "enqueue_time", "block_time", "blocked_time")
 
-        def __init__(self, pid, clock_time, last_entry=None):
+        def __init__(self, pid, clock_time):
             """
             Constructor for Log's embedded class, Entry
             This class stores data for individual processes
@@ -15,9 +20,6 @@ class Log:
             The process id and identifier for the log entry
             :param clock_time:
             The process' arrival time
-            :param last_entry:
-            Holds the previous entry of the log
-            This stores the entries as a linked list
             """
             # the id of the process this entry tracks data for
             self.pid = pid
@@ -25,12 +27,9 @@ class Log:
             self.start_time = clock_time
             # this helps calculate initial wait vs. total wait
             self.calculate_initial_wait = True
-            # log entries are implemented as a linked list
-            #   this makes it easier to calculate interarrival time
-            self.last_entry = last_entry
-            # the time when the last process has been terminated
-            self.final_complete_time = 0
-
+            # the first tick of the current wait, None if not waiting
+            # a process starts waiting as soon as it arrives
+            self.enqueue_time = clock_time
             # when the process completed
             self.end_time = 0
             # time between two processes arrivals
@@ -42,14 +41,23 @@ class Log:
             self.total_wait = 0
             # time between arrival and execution
             self.turnaround_time = 0
+            # the first tick of the current I/O block, None if not blocked
+            self.block_time = None
+            # total time blocked on I/O, not counted as waiting
+            self.blocked_time = 0
 
-        def printData(self):
-            # calculate interarrival time
-            #   AND recursively print previous entries
-            if (self.last_entry):
-                self.last_entry.printData()
-                self.interarrival_time = self.start_time - self.last_entry.start_time
+        def get_record(self):
+            """
+            :return:
+            The entry's results as a tuple, with the fields in export.FIELDS
+            """
+            return (self.pid, self.start_time, self.end_time, self.interarrival_time,
+                    self.initial_wait, self.total_wait, self.turnaround_time, self.blocked_time)
 
+        def printData(self):
+            """
+            Prints the data stored in the entry
+            """
             # Calculate turnaround time
             self.turnaround_time = self.end_time - self.start_time
 
@@ -58,30 +66,55 @@ class Log:
             print("# Start Time: " + str(self.start_time) + " End Time: " + str(self.end_time))
             print("# Interarrival Time: " + str(self.interarrival_time))
             print("# Initial Wait: " + str(self.initial_wait) + " Total Wait: " + str(self.total_wait))
+            if self.blocked_time:
+                print("# Blocked Time: " + str(self.blocked_time))
             print("# Turnaround Time: " + str(self.turnaround_time))
             print("########################################################################")
-    def __init__(self):
+    def __init__(self, exporter=None, retire_entries=False):
         """
         Constructor for Log
         Log will log data for you
+        :param exporter:
+        Optional exporter from export.py
+        Each entry is written to it as soon as its process terminates
+        :param retire_entries:
+        If True, entries are dropped once their process terminates,
+        so memory only grows with the number of live processes
+        printData then only prints the cumulative results
         """
         # init Log with 0 entries
-        self.entries = None
+        # entries are indexed by pid so every lookup is constant time
+        # dicts keep insertion order, which is the order entries were added
+        self.entries = {}
         self.number_of_entries = 0
+        # the time when the last process has been terminated
+        self.final_complete_time = 0
+        self.exporter = exporter
+        self.retire_entries = retire_entries
+        # running totals, so averages don't need every entry
+        self.total_turnaround_time = 0
+        # start time of the last entry added, for interarrival time
+        self.last_start_time = None
+        # distributions of finished processes, for percentiles
+        self.turnaround_histogram = Histogram()
+        self.initial_wait_histogram = Histogram()
+        self.total_wait_histogram = Histogram()
 
     def add_entry(self, pid, clock_time):
         """
         create a new log entry
+        entries must be added in order of arrival
         :param pid:
         the new entry's id
         :param clock_time:
         the start time for this entry
         :return:
         """
-        # create a new entry with entries as the previous entry
-        new_entry = self.Entry(pid, clock_time, self.entries)
-        # then set the new entry as the new value for entry
-        self.entries = new_entry
+        entry = self.Entry(pid, clock_time)
+        if self.last_start_time is not None:
+            entry.interarrival_time = clock_time - self.last_start_time
+        self.last_start_time = clock_time
+        self.entries[pid] = entry
         # then increment the number of entries
         self.number_of_entries += 1
 
@@ -98,19 +131,11 @@ class Log:
         True if able to call the callback
         False otherwise
         """
-        def recursive_search(entry, entry_number, value, callback):
-            if(entry and entry.pid == entry_number):
-                # If the proper entry has been found,
-                # call the callback on it
-                callback(entry, value)
-                return True
-            elif(entry and entry.last_entry):
-                # otherwise, try again with the last entry
-                # if it exists
-                recursive_search(entry.last_entry, entry_number, value, callback)
-            else:
-                return False
-        return recursive_search(self.entries, entry_number, value, callback)
+        entry = self.entries.get(entry_number)
+        if entry is None:
+            return False
+        callback(entry, value)
+        return True
 
     def check_for_entry(self, entry_number):
         """
@@ -121,27 +146,83 @@ class Log:
         True if found,
         False otherwise
         """
-        return self.modify_entry(entry_number, None, lambda a, b: True)
+        return entry_number in self.entries
 
-    def increment_wait_time(self, entry_number):
+    def increment_wait_time(self, entry_number, amount=1):
         """
         Increments wait time for an entry in the log
         :param entry_number:
         The PID for the entry to modify
+        :param amount:
+        How many clock ticks to add
+        Default value is 1
         :return:
         True if successful
         False otherwise
         """
-        def increment_wait(entry, dummy):
-            # this always increments total wait
-            entry.total_wait += 1
-            if entry.calculate_initial_wait:
-                # but only calculates initial wait as needed
-                entry.initial_wait += 1
-            else:
-                #print("Entry w/o initial wait flag: " + str(entry.pid))
-                pass
-        return self.modify_entry(entry_number, None, increment_wait)
+        entry = self.entries.get(entry_number)
+        if entry is None:
+            return False
+        # this always increments total wait
+        entry.total_wait += amount
+        if entry.calculate_initial_wait:
+            # but only calculates initial wait as needed
+            entry.initial_wait += amount
+        return True
+
+    def set_enqueue_time(self, entry_number, value):
+        """
+        Marks the start of a wait
+        The process is charged for every tick from value until
+        set_dispatch_time is called
+        :param entry_number:
+        The id of the entry to modify
+        :param value:
+        The first clock tick the process spends waiting
+        """
+        entry = self.entries.get(entry_number)
+        if entry is not None:
+            entry.enqueue_time = value
+
+    def set_dispatch_time(self, entry_number, value):
+        """
+        Marks the end of a wait and adds it to the wait times
+        :param entry_number:
+        The id of the entry to modify
+        :param value:
+        The first clock tick the process is no longer waiting
+        """
+        entry = self.entries.get(entry_number)
+        if entry is not None and entry.enqueue_time is not None:
+            entry.total_wait += value - entry.enqueue_time
+            entry.enqueue_time = None
+
+    def set_block_time(self, entry_number, value):
+        """
+        Marks the start of an I/O block
+        :param entry_number:
+        The id of the entry to modify
+        :param value:
+        The first clock tick the process spends blocked
+        """
+        entry = self.entries.get(entry_number)
+        if entry is not None:
+            entry.block_time = value
+
+    def set_wake_time(self, entry_number, value):
+        """
+        Marks the end of an I/O block and adds it to the blocked time
+        The process starts waiting in the ready queue
+        :param entry_number:
+        The id of the entry to modify
+        :param value:
+        The first clock tick the process is no longer blocked
+        """
+        entry = self.entries.get(entry_number)
+        if entry is not None and entry.block_time is not None:
+            entry.blocked_time += value - entry.block_time
+            entry.block_time = None
+            entry.enqueue_time = value
 
     def set_end_time(self, entry_number, value):
         """
@@ -151,9 +232,18 @@ class Log:
         :param value:
         The end time of the process
         """
-        def mod_end_time(entry, value):
+        entry = self.entries.get(entry_number)
+        if entry is not None:
             entry.end_time = value
-        self.modify_entry(entry_number, value, mod_end_time)
+            entry.turnaround_time = value - entry.start_time
+            self.total_turnaround_time += entry.turnaround_time
+            self.turnaround_histogram.record(entry.turnaround_time)
+            self.initial_wait_histogram.record(entry.initial_wait)
+            self.total_wait_histogram.record(entry.total_wait)
+            if self.exporter is not None:
+                self.exporter.write_entry(entry)
+            if self.retire_entries:
+                del self.entries[entry_number]
 
     def unset_initial_wait_flag(self, entry_number):
         """
@@ -162,9 +252,65 @@ class Log:
         :param entry_number:
         the process id you wish to modify
         """
-        def unset_flag(entry, dummy):
+        entry = self.entries.get(entry_number)
+        if entry is not None and entry.calculate_initial_wait:
+            # everything waited so far happened before the first execution
+            entry.initial_wait = entry.total_wait
             entry.calculate_initial_wait = False
-        self.modify_entry(entry_number, None, unset_flag)
+
+    def get_average_turnaround_time(self):
+        """
+        Calculates the average turnaround time over all processes
+        :return:
+        The average turnaround time, None if there are no processes
+        """
+        if not self.number_of_entries:
+            return None
+        return self.total_turnaround_time/self.number_of_entries
+
+    def get_average_service_time(self):
+        """
+        Calculates the average service time
+        that is, the time to finish the last process / num processes
+        :return:
+        The average service time, None if there are no processes
+        """
+        if not self.number_of_entries:
+            return None
+        return self.final_complete_time/self.number_of_entries
+
+    def get_percentiles(self, percentiles=PERCENTILES):
+        """
+        Estimates percentiles of every finished process
+        :param percentiles:
+        An iterable of numbers from 0 to 100
+        :return:
+        A dict with a dict of percentile -> value for each of
+        "turnaround_time", "initial_wait" and "total_wait"
+        """
+        return {
+            "turnaround_time": self.turnaround_histogram.get_percentiles(percentiles),
+            "initial_wait": self.initial_wait_histogram.get_percentiles(percentiles),
+            "total_wait": self.total_wait_histogram.get_percentiles(percentiles),
+        }
+
+    def merge_histograms(self, other):
+        """
+        Adds the distributions of another log to this one's
+        Used to combine the percentiles of runs done in parallel
+        :param other:
+        Another Log, or anything with the same histogram attributes
+        """
+        self.turnaround_histogram.merge(other.turnaround_histogram)
+        self.initial_wait_histogram.merge(other.initial_wait_histogram)
+        self.total_wait_histogram.merge(other.total_wait_histogram)
+
+    def flush(self):
+        """
+        Writes out anything the exporter is still buffering
+        """
+        if self.exporter is not None:
+            self.exporter.flush()
 
     def printData(self):
         """
@@ -173,23 +319,19 @@ class Log:
         # create a nice little heading
         print("########################################################################")
         # PRINT INDIVIDUAL LOG ENTRY DATA
-        self.entries.printData()
+        for entry in self.entries.values():
+            entry.printData()
 
         # PRINT CUMULATIVE RESULTS
-        def get_total_turnaround_time(entry):
-            if(entry.last_entry):
-                # if there's a previous log entry
-                # recursively add the previous entry's turnaround
-                return entry.turnaround_time + get_total_turnaround_time(entry.last_entry)
-            else:
-                # otherwise return the entry's turnaround time
-                return entry.turnaround_time
-
-        average_turnaround_time = get_total_turnaround_time(self.entries)/self.number_of_entries
-        # avg service time: time to finish last process / num processes
-        average_service_time = self.final_complete_time/self.number_of_entries
         print("########################################################################")
-        print("# Average Turnaround Time: " + str(average_turnaround_time))
-        print("# Average Service Time: " + str(average_service_time))
+        if not self.number_of_entries:
+            print("# No processes")
+            print("########################################################################")
+            return
+        print("# Average Turnaround Time: " + str(self.get_average_turnaround_time()))
+        print("# Average Service Time: " + str(self.get_average_service_time()))
+        for name, values in self.get_percentiles().items():
+            print("# " + name.replace("_", " ").title() + " Percentiles: "
+                  + " ".join("P" + str(percentile) + "=" + str(value)
+                             for percentile, value in values.items()))
         print("########################################################################")
-
@@ -18,6 +18,8 @@ PER PROCESS VALUES
 - Total Wait Time: total time process was in wait queue
 - Turnaround Time: time needed to execute a process
     Turnaround Time = Start time - end time
+- Blocked Time: time an IOProcess spent blocked on I/O
+    this isn't counted as waiting
 ------------------
 CUMULATIVE VALUES
 ------------------
@@ -55,6 +57,10 @@ computations.
 from collections import deque
 from cpu_tools import *
 from log import *
+from event_engine import EventEngine
+from profiling import *
+from timing_wheel import TimingWheel
+from timeline import Timeline
 """
 ------------------
 MASTER VARIABLES
@@ -67,6 +73,14 @@ CLOCK_TIME = 0
 CONTEXT_SWITCH_TIME = 0
 # lenght of round robin interval
 QUANTUM_TIME = 15
+# jump the clock between events instead of ticking once per time unit
+# the results are identical either way
+EVENT_DRIVEN = True
+# print how long each phase of the driver loop took
+PROFILE = False
+# write the execution timeline to this file, e.g. "run.csv"
+# CSV if it ends in .csv, binary otherwise, None to skip it
+TIMELINE_FILE = None
 # list of pre-made processes to feed into ready queue
 PROCESSES = [Process(1, 75, 0),
              Process(2, 40, 10),
@@ -74,10 +88,32 @@ PROCESSES = [Process(1, 75, 0),
              Process(4, 20, 80),
              Process(5, 45, 85)]
 
-def main():
+def main(profiler=None):
     """
     driver function that demonstrates the scheduling system
+    :param profiler:
+    Optional PhaseProfiler to time the loop with
+    Default is a new one if PROFILE is set
+    :return:
+    The Log holding the results
     """
+    # time each phase of the loop if asked to
+    if profiler is None and PROFILE:
+        profiler = PhaseProfiler()
+    # record which process held the CPU when, if asked to
+    timeline = Timeline() if TIMELINE_FILE else None
+
+    if EVENT_DRIVEN:
+        engine = EventEngine(PROCESSES, QUANTUM_TIME, CONTEXT_SWITCH_TIME, CLOCK_TIME,
+                             profiler=profiler, timeline=timeline)
+        log = engine.run()
+        log.printData()
+        if profiler is not None:
+            profiler.report()
+        if timeline is not None:
+            timeline.write(TIMELINE_FILE)
+        return log
+
     # create the Log
     log = Log()
     # create a local var to represent clocktime
@@ -88,7 +124,7 @@ def main():
 
     # create process manager
     process_manager = ProcessManager(PROCESSES, ready_queue)
-    # init with PROCESSES defined above and the ready queue
+    # init with a copy of PROCESSES and the ready queue
 
     # create the round robin scheduler
     scheduler = RoundRobin(QUANTUM_TIME)
@@ -96,10 +132,17 @@ def main():
     # create the CPU
     cpu = CPU(CONTEXT_SWITCH_TIME, clock_time)
 
+    if profiler is not None:
+        profiler.instrument(log, LOG_METHODS, "Log.")
+        profiler.instrument(cpu, CPU_METHODS, "CPU.")
+
     # on deck is a process that is awaiting for
     # a context switch to complete
     on_deck = None
 
+    # processes blocked on I/O, until they wake up
+    blocked = TimingWheel(clock_time)
+
     # add all processes to log
     # but make sure to sort them by their arrival time first
     for process in sorted(PROCESSES, key=lambda a: a.arrival_time):
@@ -108,25 +151,38 @@ def main():
     # flag indicating whether there are still processes
     keep_processing = True
     while keep_processing:
+        if profiler is not None:
+            profiler.start()
+
         # 1. FEED PROCESSES
         # give the current time to process manager
         process_manager.feed_ready_queue(clock_time)
         # this will feed processes into the ready queue
         # at the appropriate time
+        # 1.1 WAKE PROCESSES WHOSE I/O IS DONE
+        for wake_time, process in blocked.advance(clock_time):
+            ready_queue.appendleft(process)
+            # it starts waiting as soon as it wakes up
+            log.set_wake_time(process.id, wake_time)
+        if profiler is not None:
+            profiler.lap("1. feed")
 
         # 2. GIVE CPU NEW CLOCK TIME
         cpu.set_clock(clock_time)
+        if profiler is not None:
+            profiler.lap("2. set clock")
 
         # 3. BOOKKEEPING PT 1
         # 3.1 CLEAR ON_DECK IF PROCESSOR IS RUNNING
         if cpu.status == "running":
+            if on_deck:
+                # the context switch is over, so on deck stops waiting
+                log.set_dispatch_time(on_deck.id, clock_time)
             on_deck = None
-        # 3.2 INCREMENT READY QUEUE WAIT TIMES
-        for process in ready_queue:
-            log.increment_wait_time(process.id)
-        # 3.3 INCREMENT ON DECK WAIT TIMES
-        if (on_deck):
-            log.increment_wait_time(on_deck.id)
+        # wait times are tracked from enqueue and dispatch times
+        # so nothing has to be charged to every waiting process each tick
+        if profiler is not None:
+            profiler.lap("3. bookkeeping")
 
         # 4. CHECK IF A CONTEXT SWITCH IS APPROPRIATE
         # 4.1 IF THIS IS THE FIRST PROCESS AND A FULL CS
@@ -136,6 +192,8 @@ def main():
             # if a process is in the ready queue yet
             if ready_queue:
                 cpu.switch_process(ready_queue.pop())
+                # it waited this tick, but executes right away
+                log.set_dispatch_time(cpu.active_process.id, clock_time + 1)
         # 4.2 IF THE PROCESSOR IS FREE
         elif cpu.status == "free":
             # if a process has terminated and the CPU
@@ -155,8 +213,13 @@ def main():
                 on_deck = ready_queue.pop()
                 # store in on_deck for bookkeeping
                 cpu.switch_process(on_deck)
+        if profiler is not None:
+            profiler.lap("4. context switch decision")
 
         # 5. EXECUTE PROCESS
+        if timeline is not None:
+            # note what the CPU spends this tick on
+            timeline.record_cpu(clock_time, clock_time + 1, cpu)
         if cpu.status == "running":
             # if the CPU is running, execute the process
             log.unset_initial_wait_flag(cpu.active_process.id)
@@ -164,10 +227,18 @@ def main():
             # for this process
             finished_process_id = cpu.execute_process()
             # 5.1 IF THE PROCESS IS DONE EXECUTING
-            if finished_process_id:
+            if finished_process_id is not None:
                 # if the process is done do some bookkeeping
                 log.set_end_time(finished_process_id, clock_time)
                 # save this process's end time
+            # 5.2 IF THE PROCESS BLOCKED ON I/O
+            blocked_process = cpu.retrieve_blocked_process()
+            if blocked_process:
+                # park it until its I/O burst is done
+                # it's blocked from the next tick on
+                log.set_block_time(blocked_process.id, clock_time + 1)
+                blocked.schedule(clock_time + blocked_process.start_io() + 1, blocked_process)
+            if finished_process_id is not None or blocked_process is not None:
                 if ready_queue:
                     # first try to immediately load a new process
                     on_deck = ready_queue.pop()
@@ -176,23 +247,38 @@ def main():
                 else:
                     # otherwise, mark the CPU as free
                     cpu.status = "free"
+        if profiler is not None:
+            profiler.lap("5. execute")
 
         # 6. RECOVER PROCESS FROM CPU AFTER CONTEXT SWITCH
         old_process = cpu.retrieve_previous_process()
         if old_process:
             ready_queue.appendleft(old_process)
+            # it starts waiting again on the next tick
+            log.set_enqueue_time(old_process.id, clock_time + 1)
+        if profiler is not None:
+            profiler.lap("6. recover")
 
         # 7. BOOKKEEPING PT 2
         # 7.1 SIGNAL END OF DRIVER IF APPROPRIATE
-        if not ready_queue and not PROCESSES and cpu.status == "free" and not cpu.old_process:
+        if not ready_queue and not process_manager.has_pending_processes() \
+                and cpu.status == "free" and not cpu.old_process and not blocked:
             keep_processing = False
             # note the final clock time in the log
             log.final_complete_time = clock_time
         # 7.2 INCREMENT CLOCKTIME
         clock_time += 1
+        if profiler is not None:
+            profiler.lap("7. termination check")
 
     # print results
     log.printData()
+    if profiler is not None:
+        profiler.report()
+    if timeline is not None:
+        timeline.write(TIMELINE_FILE)
+    return log
 
-main()
+if __name__ == "__main__":
+    main()
 
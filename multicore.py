@@ -0,0 +1,349 @@
+# Scheduling on several CPU cores
+"""
+Drives N CPU instances off the same clock, with the same phases as the
+single core driver in main.py, run for each core in turn (core 0 first).
+
+Two queueing modes are supported:
+- "shared": every core pops from one global ready queue
+- "per_core": each core has its own ready queue
+    arriving processes are placed by a load balancing policy
+        "round_robin": cores take turns
+        "shortest_queue": the core with the least queued work
+    a free core with an empty queue can steal the most recently queued
+    process from the longest other queue (work stealing)
+
+Preempted processes go back to the queue of the core they ran on, and
+so do processes waking up from I/O.
+
+Per core results:
+- utilization: ticks spent executing / total ticks
+- migrations: processes dispatched here that last ran on another core
+- steals: processes taken from another core's queue
+
+With one core in shared mode the results are identical to main.main().
+Quiet ticks are skipped the same way EventEngine does it.
+"""
+from collections import deque
+from cpu_tools import *
+from log import *
+from timing_wheel import TimingWheel
+
+QUEUE_MODES = ("shared", "per_core")
+BALANCING_POLICIES = ("round_robin", "shortest_queue")
+
+
+class MultiCoreEngine:
+    """
+    Scheduling simulation for a CPU with several cores
+    """
+    def __init__(self, processes, cores=2, quantum_time=15, context_switch_time=0,
+                 clock_time=0, queue_mode="shared", balancing="round_robin",
+                 work_stealing=True, log=None, scheduler=None):
+        """
+        Constructor for the MultiCoreEngine
+        :param processes:
+        A list of processes or a ProcessTable
+        :param cores:
+        The number of CPU cores
+        :param quantum_time:
+        The time quantum for the timer interrupt
+        :param context_switch_time:
+        How long a context switch will take
+        :param clock_time:
+        The starting clock time
+        :param queue_mode:
+        "shared" or "per_core"
+        :param balancing:
+        How arrivals are placed in per_core mode
+        "round_robin" or "shortest_queue"
+        :param work_stealing:
+        Whether free cores steal from other queues in per_core mode
+        :param log:
+        The Log to record results in
+        Default is a new Log
+        :param scheduler:
+        The scheduler to use, see cpu_tools
+        Default is RoundRobin(quantum_time)
+        """
+        if queue_mode not in QUEUE_MODES:
+            raise ValueError("Unknown queue mode: " + str(queue_mode))
+        if balancing not in BALANCING_POLICIES:
+            raise ValueError("Unknown balancing policy: " + str(balancing))
+        # processes are added to the log as they arrive
+        self.log = log if log is not None else Log()
+        self.clock_time = clock_time
+        self.start_time = clock_time
+        self.queue_mode = queue_mode
+        self.balancing = balancing
+        self.work_stealing = work_stealing and queue_mode == "per_core"
+
+        self.scheduler = scheduler if scheduler is not None else RoundRobin(quantum_time)
+        self.cpus = [CPU(context_switch_time, clock_time) for core in range(cores)]
+        if queue_mode == "shared":
+            # every core shares the same queue
+            shared_queue = self.scheduler.make_ready_queue()
+            self.ready_queues = [shared_queue] * cores
+            self.process_manager = ProcessManager(processes, shared_queue)
+        else:
+            self.ready_queues = [self.scheduler.make_ready_queue() for core in range(cores)]
+            # arrivals land here first, then get placed on a core
+            self.arrivals = deque()
+            self.process_manager = ProcessManager(processes, self.arrivals)
+            # the core the next arrival goes to with round_robin balancing
+            self.next_core = 0
+        # processes waiting for a context switch to complete, one per core
+        self.on_deck = [None] * cores
+        # the core each live process last ran on
+        self.last_core = {}
+        # processes blocked on I/O, until they wake up
+        self.blocked = TimingWheel(clock_time)
+
+        # per core statistics
+        self.busy_time = [0] * cores
+        self.migrations = [0] * cores
+        self.steals = [0] * cores
+
+        # flag indicating whether there are still processes
+        self.keep_processing = True
+
+    def place_arrivals(self):
+        """
+        Moves newly arrived processes onto a core's ready queue
+        Only used in per_core mode
+        """
+        ready_queues = self.ready_queues
+        while self.arrivals:
+            process = self.arrivals.pop()
+            if self.balancing == "round_robin":
+                core = self.next_core
+                self.next_core = (core + 1) % len(ready_queues)
+            else:
+                # count the process on the CPU as queued work too
+                core = min(range(len(ready_queues)),
+                           key=lambda i: len(ready_queues[i]) + (self.cpus[i].status != "free"))
+            ready_queues[core].appendleft(process)
+
+    def find_victim(self, core):
+        """
+        Finds a queue to steal from
+        :param core:
+        The core looking for work
+        :return:
+        The longest other ready queue, or None if there is nothing to steal
+        """
+        if not self.work_stealing:
+            return None
+        victim = max(self.ready_queues, key=len)
+        if victim and victim is not self.ready_queues[core]:
+            return victim
+        return None
+
+    def take_process(self, core):
+        """
+        Takes the next process for a core that needs one
+        Tries the core's own queue, then steals if allowed
+        :param core:
+        The core index
+        :return:
+        A process, or None if there is no work for this core
+        """
+        queue = self.ready_queues[core]
+        if queue:
+            return queue.pop()
+        victim = self.find_victim(core)
+        if victim is not None:
+            self.steals[core] += 1
+            # steal from the opposite end the owner pops from
+            return victim.popleft()
+        return None
+
+    def has_work(self, core):
+        """
+        Checks if a core could pick up a process right now
+        :param core:
+        The core index
+        """
+        return bool(self.ready_queues[core]) or self.find_victim(core) is not None
+
+    def dispatch(self, core, process):
+        """
+        Starts loading a process onto a core and tracks migrations
+        :param core:
+        The core index
+        :param process:
+        The process to load
+        """
+        last_core = self.last_core.get(process.id)
+        if last_core is not None and last_core != core:
+            self.migrations[core] += 1
+        self.last_core[process.id] = core
+        self.cpus[core].switch_process(process)
+
+    def tick(self):
+        """
+        Runs a single clock tick on every core
+        """
+        log = self.log
+        clock_time = self.clock_time
+        cpus = self.cpus
+        on_deck = self.on_deck
+
+        # 1. FEED PROCESSES
+        for process in self.process_manager.feed_ready_queue(clock_time):
+            log.add_entry(process.id, process.arrival_time)
+        if self.queue_mode == "per_core":
+            self.place_arrivals()
+        # 1.1 WAKE PROCESSES WHOSE I/O IS DONE
+        if self.blocked:
+            for wake_time, process in self.blocked.advance(clock_time):
+                self.ready_queues[self.last_core[process.id]].appendleft(process)
+                log.set_wake_time(process.id, wake_time)
+
+        for core in range(len(cpus)):
+            cpu = cpus[core]
+            ready_queue = self.ready_queues[core]
+
+            # 2. GIVE CPU NEW CLOCK TIME
+            cpu.set_clock(clock_time)
+
+            # 3. BOOKKEEPING PT 1
+            if cpu.status == "running":
+                if on_deck[core]:
+                    log.set_dispatch_time(on_deck[core].id, clock_time)
+                on_deck[core] = None
+
+            # 4. CHECK IF A CONTEXT SWITCH IS APPROPRIATE
+            if cpu.first_process:
+                process = self.take_process(core)
+                if process:
+                    self.dispatch(core, process)
+                    log.set_dispatch_time(process.id, clock_time + 1)
+            elif cpu.status == "free":
+                process = self.take_process(core)
+                if process:
+                    on_deck[core] = process
+                    self.dispatch(core, process)
+            elif cpu.status != "cs" \
+                    and self.scheduler.switch_process(clock_time, cpu.active_process, ready_queue):
+                # preemption only looks at this core's own queue
+                if ready_queue:
+                    on_deck[core] = ready_queue.pop()
+                    self.dispatch(core, on_deck[core])
+
+            # 5. EXECUTE PROCESS
+            if cpu.status == "running":
+                log.unset_initial_wait_flag(cpu.active_process.id)
+                self.busy_time[core] += 1
+                finished_process_id = cpu.execute_process()
+                if finished_process_id is not None:
+                    log.set_end_time(finished_process_id, clock_time)
+                    self.last_core.pop(finished_process_id, None)
+                blocked_process = cpu.retrieve_blocked_process()
+                if blocked_process:
+                    log.set_block_time(blocked_process.id, clock_time + 1)
+                    self.blocked.schedule(clock_time + blocked_process.start_io() + 1,
+                                          blocked_process)
+                if finished_process_id is not None or blocked_process is not None:
+                    process = self.take_process(core)
+                    if process:
+                        on_deck[core] = process
+                        self.dispatch(core, process)
+                    else:
+                        cpu.status = "free"
+
+            # 6. RECOVER PROCESS FROM CPU AFTER CONTEXT SWITCH
+            old_process = cpu.retrieve_previous_process()
+            if old_process:
+                ready_queue.appendleft(old_process)
+                log.set_enqueue_time(old_process.id, clock_time + 1)
+
+        # 7. BOOKKEEPING PT 2
+        if not self.process_manager.has_pending_processes() \
+                and not any(self.ready_queues) and not self.blocked \
+                and all(cpu.status == "free" for cpu in cpus):
+            self.keep_processing = False
+            log.final_complete_time = clock_time
+        self.clock_time += 1
+
+    def next_event_time(self):
+        """
+        Computes the next clock time where something other than
+        plain execution or waiting can happen on any core
+        :return:
+        The clock time of the next tick that must be fully simulated
+        """
+        candidates = []
+        next_arrival = self.process_manager.next_arrival_time()
+        if next_arrival is not None:
+            candidates.append(next_arrival)
+        next_wake = self.blocked.next_expiry()
+        if next_wake is not None:
+            candidates.append(next_wake)
+
+        for core in range(len(self.cpus)):
+            cpu = self.cpus[core]
+            if cpu.first_process or cpu.status == "free":
+                if self.has_work(core):
+                    return self.clock_time
+            elif cpu.status == "running":
+                candidates.append(self.clock_time + cpu.active_process.service_time - 1)
+                switch_time = self.scheduler.next_switch_time(self.clock_time, cpu.active_process,
+                                                              self.ready_queues[core])
+                if switch_time is not None:
+                    candidates.append(switch_time)
+            elif cpu.status == "cs":
+                candidates.append(cpu.cs_start_time + cpu.cs)
+
+        if not candidates:
+            return self.clock_time
+        return max(min(candidates), self.clock_time)
+
+    def skip_to(self, event_time):
+        """
+        Applies every quiet tick before event_time in one step
+        :param event_time:
+        The clock time of the next tick that must be fully simulated
+        """
+        elapsed = event_time - self.clock_time
+        if elapsed <= 0:
+            return
+        for core in range(len(self.cpus)):
+            cpu = self.cpus[core]
+            if cpu.status == "running":
+                cpu.active_process.service_time -= elapsed
+                self.busy_time[core] += elapsed
+            cpu.clock_time = event_time - 1
+        self.clock_time = event_time
+
+    def run(self):
+        """
+        Runs the simulation until every process has terminated
+        :return:
+        The Log holding the per process results
+        """
+        while self.keep_processing:
+            self.tick()
+            if self.keep_processing:
+                self.skip_to(self.next_event_time())
+        return self.log
+
+    def get_utilization(self):
+        """
+        Calculates how busy each core was
+        :return:
+        A list with the fraction of ticks each core spent executing
+        """
+        total_time = self.log.final_complete_time - self.start_time + 1
+        return [busy_time / total_time for busy_time in self.busy_time]
+
+    def printData(self):
+        """
+        Prints the per core statistics
+        """
+        utilization = self.get_utilization()
+        print("########################################################################")
+        for core in range(len(self.cpus)):
+            print("# Core: " + str(core) + " Utilization: " + str(round(utilization[core], 4))
+                  + " Migrations: " + str(self.migrations[core])
+                  + " Steals: " + str(self.steals[core]))
+        print("########################################################################")
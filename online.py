@@ -0,0 +1,262 @@
+# Online scheduling of processes arriving from a live stream
+"""
+OnlineEngine runs the event driven engine against an asynchronous
+source of arrivals, such as an async generator or a socket, instead of
+a workload known up front.
+
+The clock only moves past time T once no more arrivals at or before T
+can come: either an arrival after T has been received, or the source
+has ended. Arrivals must come in order of arrival time, like in a
+trace file.
+
+completions() is an async generator that yields a record for each
+process as soon as it terminates. Both ends are pulled, never pushed:
+the source is only read when the clock needs to move past the last
+arrival received, and the engine doesn't run ahead while the consumer
+hasn't taken the records it already has. Finished entries are retired
+from the Log, so memory only grows with the number of processes that
+are in the system.
+
+    async def shadow(source):
+        async for record in OnlineEngine(source, quantum_time=10).completions():
+            print(record)
+
+A feed can be read from a socket, one "id service_time arrival_time"
+line per process:
+
+    python online.py --host localhost --port 9000
+"""
+import argparse
+import asyncio
+from collections import deque
+from cpu_tools import *
+from log import *
+from event_engine import EventEngine
+from export import FIELDS
+
+
+class StreamProcessManager:
+    """
+    ProcessManager for arrivals that are received while the simulation
+    runs
+    """
+    def __init__(self, ready_queue):
+        """
+        Constructor for StreamProcessManager
+        :param ready_queue:
+        The ready queue processes are fed to
+        """
+        self.ready_queue = ready_queue
+        # received processes that haven't arrived yet, oldest first
+        self.pending = deque()
+        # set once the source has no more processes
+        self.closed = False
+        self.last_arrival_time = None
+
+    def receive(self, process):
+        """
+        Accepts a process from the source
+        :param process:
+        A Process, arriving no earlier than the last one received
+        """
+        if self.last_arrival_time is not None and process.arrival_time < self.last_arrival_time:
+            raise ValueError("Process " + str(process.id) + " arrived out of order")
+        self.last_arrival_time = process.arrival_time
+        self.pending.append(process)
+
+    def known_until(self, clock_time):
+        """
+        Checks that every arrival at or before a clock time is known
+        :param clock_time:
+        The clock time of the next tick
+        :return:
+        True if that tick can be run without reading the source
+        """
+        return self.closed or (self.pending and self.pending[-1].arrival_time > clock_time)
+
+    def feed_ready_queue(self, clock_time):
+        """
+        Feeds every received process that has arrived by now
+        :param clock_time:
+        The current clock time
+        :return:
+        A list of the processes fed, in order of arrival
+        """
+        pending = self.pending
+        fed = []
+        while pending and pending[0].arrival_time <= clock_time:
+            process = pending.popleft()
+            self.ready_queue.appendleft(process)
+            fed.append(process)
+        return fed
+
+    def has_pending_processes(self):
+        """
+        Checks for processes that haven't arrived yet
+        :return:
+        True until the source has ended and everything received was fed
+        """
+        return bool(self.pending) or not self.closed
+
+    def next_arrival_time(self):
+        """
+        Gives the arrival time of the next received process
+        :return:
+        The earliest arrival time that hasn't been fed yet
+        None if no such process has been received
+        """
+        if self.pending:
+            return self.pending[0].arrival_time
+        return None
+
+
+class CompletionBuffer:
+    """
+    Log exporter that holds finished records until they are yielded
+    """
+    def __init__(self):
+        self.records = deque()
+
+    def write_entry(self, entry):
+        """
+        Queues a finished Log entry
+        :param entry:
+        A Log.Entry
+        """
+        self.records.append(entry.get_record())
+
+    def flush(self):
+        """
+        Records are handed out by OnlineEngine.completions
+        """
+        pass
+
+
+class OnlineEngine(EventEngine):
+    """
+    Event driven simulation fed by an asynchronous arrival source
+    """
+    def __init__(self, source, quantum_time=15, context_switch_time=0, clock_time=0,
+                 scheduler=None, yield_interval=1000):
+        """
+        Constructor for the OnlineEngine
+        :param source:
+        An async iterable of Process objects, or of
+        (id, service time, arrival time) tuples, in order of arrival
+        :param quantum_time:
+        The time quantum for the timer interrupt
+        :param context_switch_time:
+        How long a context switch will take
+        :param clock_time:
+        The starting clock time
+        :param scheduler:
+        The scheduler to use, see cpu_tools
+        Default is RoundRobin(quantum_time)
+        :param yield_interval:
+        How many ticks to run before letting other tasks run,
+        if nothing else made the engine wait
+        """
+        self.completed = CompletionBuffer()
+        EventEngine.__init__(self, (), quantum_time, context_switch_time, clock_time,
+                             log=Log(self.completed, retire_entries=True),
+                             scheduler=scheduler)
+        self.process_manager = StreamProcessManager(self.ready_queue)
+        self.source = source.__aiter__()
+        self.yield_interval = yield_interval
+
+    async def receive(self):
+        """
+        Reads the next process from the source
+        Marks the stream closed once the source ends
+        """
+        try:
+            process = await self.source.__anext__()
+        except StopAsyncIteration:
+            self.process_manager.closed = True
+            return
+        if not isinstance(process, Process):
+            process = Process(*process)
+        self.process_manager.receive(process)
+
+    async def completions(self):
+        """
+        Runs the simulation until the source ends and every process
+        has terminated
+        :return:
+        An async generator of per process records, with the fields in
+        export.FIELDS, in order of termination
+        """
+        process_manager = self.process_manager
+        records = self.completed.records
+        ticks = 0
+        while self.keep_processing:
+            # the next tick needs every arrival up to its clock time
+            while not process_manager.known_until(self.clock_time):
+                await self.receive()
+                ticks = 0
+            self.tick()
+            while records:
+                # the consumer decides when the engine goes on
+                yield records.popleft()
+                ticks = 0
+            if self.keep_processing:
+                self.skip_to(self.next_event_time())
+            ticks += 1
+            if ticks >= self.yield_interval:
+                await asyncio.sleep(0)
+                ticks = 0
+
+
+async def read_arrivals(reader):
+    """
+    Reads processes from a stream, one per line
+    :param reader:
+    An asyncio.StreamReader
+    Each line is "id service_time arrival_time", blank lines are skipped
+    :return:
+    An async generator of (id, service time, arrival time) tuples
+    """
+    async for line in reader:
+        fields = line.split()
+        if fields:
+            yield tuple(int(field) for field in fields)
+
+
+async def shadow_run(host, port, quantum_time, context_switch_time, file=None):
+    """
+    Schedules the processes read from a socket and prints a tab
+    separated record as each one terminates
+    :param host:
+    The host of the feed
+    :param port:
+    The port of the feed
+    :param file:
+    Where to write the records
+    Default is whatever sys.stdout is when it's called
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        engine = OnlineEngine(read_arrivals(reader), quantum_time, context_switch_time)
+        print("\t".join(FIELDS), file=file)
+        async for record in engine.completions():
+            print("\t".join(str(value) for value in record), file=file)
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Schedule processes read from a live feed")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--quantum", type=int, default=15)
+    parser.add_argument("--context-switch", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    asyncio.run(shadow_run(args.host, args.port, args.quantum, args.context_switch))
+
+
+if __name__ == "__main__":
+    main()
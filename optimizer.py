@@ -0,0 +1,348 @@
+# Searches for the best quantum for a workload
+"""
+optimize_quantum() picks the quantum that minimizes an objective on a
+workload, without running a full simulation for every candidate.
+
+Objectives, see OBJECTIVES:
+- "mean_turnaround": average turnaround time, lower is better
+- "p99_wait": 99th percentile of total wait, lower is better
+- "throughput": processes finished per tick, higher is better
+
+Methods:
+- "halving": successive halving. Every candidate quantum is run on a
+    small prefix of the workload, in order of arrival. The best
+    1 / eta of them move on to a prefix eta times longer, until the
+    last round, which runs the survivors on the whole workload.
+- "golden": golden-section search over the integers between the
+    bounds, on the whole workload. It assumes the objective has a single
+    minimum between them, and needs about log(range) evaluations.
+
+Each round's candidates are evaluated in parallel on a pool of worker
+processes, which get the workload once, as in sweep.py. Evaluations are
+memoized by (quantum, prefix length). With a result_cache.ResultCache
+they are also stored on disk between runs.
+Quanta that livelock with the context switch time are never run and
+count as the worst possible value.
+
+Usage:
+    python optimizer.py --processes 10000 --context-switch 1 --objective p99_wait
+"""
+import argparse
+import math
+from multiprocessing import Pool
+from cpu_tools import *
+from simulation import Simulation, livelocks
+from result_cache import workload_digest
+
+
+def mean_turnaround(result):
+    return result.average_turnaround_time
+
+
+def p99_wait(result):
+    return result.percentiles["total_wait"][99]
+
+
+def throughput(result):
+    return result.number_of_processes / (result.final_complete_time + 1)
+
+
+# objective name -> (function of a SimulationResult, True if higher is better)
+OBJECTIVES = {
+    "mean_turnaround": (mean_turnaround, False),
+    "p99_wait": (p99_wait, False),
+    "throughput": (throughput, True),
+}
+METHODS = ("halving", "golden")
+
+# the workload and settings shared by every task a worker runs
+# set once per worker by init_worker
+_workload = None
+_context_switch_time = None
+_cache = None
+# prefix length -> prefix of _workload, built on first use
+_prefixes = {}
+
+
+def init_worker(workload, context_switch_time, cache=None):
+    """
+    Pool initializer, stores the workload in the worker
+    :param workload:
+    A ProcessTable sorted by arrival time
+    :param context_switch_time:
+    How long a context switch will take
+    :param cache:
+    Optional ResultCache
+    """
+    global _workload, _context_switch_time, _cache, _prefixes
+    _workload = workload
+    _context_switch_time = context_switch_time
+    _cache = cache
+    _prefixes = {len(workload): (workload, workload_digest(workload) if cache else None)}
+
+
+def get_prefix(size):
+    """
+    Gives the first processes of the shared workload
+    :param size:
+    How many processes
+    :return:
+    A (ProcessTable, digest) pair, the digest is None without a cache
+    """
+    if size not in _prefixes:
+        prefix = ProcessTable(_workload.ids[:size], _workload.service_times[:size],
+                              _workload.arrival_times[:size])
+        _prefixes[size] = (prefix, workload_digest(prefix) if _cache else None)
+    return _prefixes[size]
+
+
+def evaluate(task):
+    """
+    Simulates a prefix of the shared workload with one quantum
+    :param task:
+    A (quantum time, prefix length, objective name) tuple
+    :return:
+    The objective's value
+    """
+    quantum_time, size, objective = task
+    prefix, digest = get_prefix(size)
+    simulation = Simulation(prefix, quantum_time, _context_switch_time, retire_entries=True)
+    if _cache is None:
+        result = simulation.run()
+    else:
+        result = _cache.run(simulation, digest)
+    return OBJECTIVES[objective][0](result)
+
+
+class OptimizationResult:
+    """
+    The outcome of optimize_quantum
+    """
+    def __init__(self, objective, evaluations, size):
+        """
+        Constructor for OptimizationResult
+        :param objective:
+        The objective name
+        :param evaluations:
+        A dict of (quantum, prefix length) -> objective value
+        None for quanta that livelock
+        :param size:
+        The length of the whole workload
+        """
+        self.objective = objective
+        self.evaluations = evaluations
+        # quantum -> value, on the whole workload only
+        self.curve = sorted((quantum, value) for (quantum, length), value in evaluations.items()
+                            if length == size)
+        sign = -1 if OBJECTIVES[objective][1] else 1
+        finished = [(quantum, value) for quantum, value in self.curve if value is not None]
+        if finished:
+            # ties go to the smaller quantum
+            self.best_quantum, self.best_value = min(
+                finished, key=lambda point: (sign * point[1], point[0]))
+        else:
+            self.best_quantum, self.best_value = None, None
+
+    def printData(self):
+        """
+        Prints the curve and the best quantum
+        """
+        print("########################################################################")
+        for quantum, value in self.curve:
+            print("# Quantum: " + str(quantum) + " " + self.objective + ": "
+                  + ("livelock" if value is None else str(value)))
+        print("########################################################################")
+        print("# Best Quantum: " + str(self.best_quantum) + " " + self.objective + ": "
+              + str(self.best_value) + " (" + str(len(self.evaluations)) + " evaluations)")
+        print("########################################################################")
+
+
+class Evaluator:
+    """
+    Runs and memoizes evaluations on a worker pool
+    """
+    def __init__(self, pool, context_switch_time, objective):
+        self.pool = pool
+        self.context_switch_time = context_switch_time
+        self.objective = objective
+        self.higher_is_better = OBJECTIVES[objective][1]
+        # (quantum, prefix length) -> objective value
+        self.evaluations = {}
+
+    def evaluate(self, quanta, size):
+        """
+        Evaluates quanta on a prefix, running the new ones in parallel
+        :param quanta:
+        An iterable of quantum lengths
+        :param size:
+        The prefix length
+        :return:
+        A list of costs, lower is better, infinite for livelocks
+        """
+        quanta = list(quanta)
+        tasks = [(quantum, size, self.objective) for quantum in quanta
+                 if (quantum, size) not in self.evaluations
+                 and not livelocks(quantum, self.context_switch_time)]
+        for task, value in zip(tasks, self.pool.map(evaluate, tasks, chunksize=1)):
+            self.evaluations[task[0], size] = value
+        costs = []
+        for quantum in quanta:
+            value = self.evaluations.setdefault((quantum, size), None)
+            if value is None:
+                costs.append(math.inf)
+            else:
+                costs.append(-value if self.higher_is_better else value)
+        return costs
+
+
+def successive_halving(evaluator, candidates, size, eta=3, min_size=100):
+    """
+    Narrows down candidate quanta on longer and longer prefixes
+    :param evaluator:
+    An Evaluator
+    :param candidates:
+    A list of quantum lengths
+    :param size:
+    The length of the whole workload
+    :param eta:
+    The fraction of candidates dropped each round is 1 - 1 / eta
+    :param min_size:
+    The shortest prefix to evaluate on
+    """
+    # enough rounds to narrow the candidates down to one
+    rounds = 1
+    while eta ** rounds < len(candidates):
+        rounds += 1
+    for round_number in range(rounds):
+        # the last round always runs on the whole workload
+        prefix = size if round_number == rounds - 1 else \
+            min(size, max(min_size, size // eta ** (rounds - 1 - round_number)))
+        costs = evaluator.evaluate(candidates, prefix)
+        keep = max(1, int(math.ceil(len(candidates) / eta)))
+        if round_number < rounds - 1:
+            ranked = sorted(zip(costs, candidates))
+            candidates = sorted(quantum for cost, quantum in ranked[:keep])
+
+
+def golden_section(evaluator, low, high, size):
+    """
+    Golden-section search for the best integer quantum
+    :param evaluator:
+    An Evaluator
+    :param low:
+    The smallest quantum
+    :param high:
+    The largest quantum
+    :param size:
+    The length of the whole workload
+    """
+    ratio = (math.sqrt(5) - 1) / 2
+    left = high - int(round((high - low) * ratio))
+    right = low + int(round((high - low) * ratio))
+    if high - low > 3 and left < right:
+        left_cost, right_cost = evaluator.evaluate((left, right), size)
+        # the probe on the surviving side is kept, so each step runs one new point
+        while high - low > 3:
+            if left_cost <= right_cost:
+                high = right
+                right, right_cost = left, left_cost
+                # rounding can land the new probe on the kept one
+                left = min(high - int(round((high - low) * ratio)), right - 1)
+                if left < low:
+                    break
+                left_cost = evaluator.evaluate((left,), size)[0]
+            else:
+                low = left
+                left, left_cost = right, right_cost
+                right = max(low + int(round((high - low) * ratio)), left + 1)
+                if right > high:
+                    break
+                right_cost = evaluator.evaluate((right,), size)[0]
+    evaluator.evaluate(range(low, high + 1), size)
+
+
+def optimize_quantum(processes, context_switch_time=0, objective="mean_turnaround",
+                     min_quantum=1, max_quantum=100, method="halving", step=1, eta=3,
+                     min_size=100, workers=None, cache=None):
+    """
+    Searches for the quantum that gives the best objective value
+    :param processes:
+    A list of processes, a ProcessTable or a trace_file.TraceReader
+    :param context_switch_time:
+    How long a context switch will take
+    :param objective:
+    A name in OBJECTIVES
+    :param min_quantum:
+    The smallest quantum to consider
+    :param max_quantum:
+    The largest quantum to consider
+    :param method:
+    "halving" or "golden"
+    :param step:
+    The spacing of the candidate quanta for "halving"
+    :param eta:
+    How aggressively "halving" drops candidates
+    :param min_size:
+    The shortest workload prefix "halving" evaluates on
+    :param workers:
+    How many worker processes to use
+    Default is one per core
+    :param cache:
+    Optional ResultCache to store evaluations in
+    :return:
+    An OptimizationResult
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError("Unknown objective: " + str(objective))
+    if method not in METHODS:
+        raise ValueError("Unknown method: " + str(method))
+    if hasattr(processes, "arrival_times"):
+        table = processes.sorted_by_arrival()
+        table = ProcessTable(table.ids, table.service_times, table.arrival_times)
+    else:
+        table = ProcessTable.from_processes(sorted(processes, key=lambda a: a.arrival_time))
+
+    with Pool(workers, initializer=init_worker,
+              initargs=(table, context_switch_time, cache)) as pool:
+        evaluator = Evaluator(pool, context_switch_time, objective)
+        if method == "halving":
+            successive_halving(evaluator, list(range(min_quantum, max_quantum + 1, step)),
+                               len(table), eta, min_size)
+        else:
+            golden_section(evaluator, min_quantum, max_quantum, len(table))
+    return OptimizationResult(objective, evaluator.evaluations, len(table))
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    Generates a workload with process_generator and optimizes it
+    """
+    parser = argparse.ArgumentParser(description="Search for the best quantum")
+    parser.add_argument("--processes", type=int, default=10000,
+                        help="number of processes to generate")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the workload generator")
+    parser.add_argument("--context-switch", type=int, default=1)
+    parser.add_argument("--objective", default="mean_turnaround", choices=sorted(OBJECTIVES))
+    parser.add_argument("--method", default="halving", choices=METHODS)
+    parser.add_argument("--min-quantum", type=int, default=1)
+    parser.add_argument("--max-quantum", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes, default one per core")
+    parser.add_argument("--cache-dir", default=None,
+                        help="directory to cache results in, default no caching")
+    args = parser.parse_args(argv)
+
+    # imported here since it needs NumPy
+    from process_generator import generate_process_table
+    from result_cache import ResultCache
+    workload = generate_process_table(args.processes, seed=args.seed)
+    cache = ResultCache(args.cache_dir) if args.cache_dir else None
+    optimize_quantum(workload, args.context_switch, args.objective, args.min_quantum,
+                     args.max_quantum, args.method, workers=args.workers,
+                     cache=cache).printData()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,30 +5,42 @@ Pt 1:
 - write a function to calculate arrival times
 Pt 2:
 - generate 100 service times between 2 and 5
+
+generate_process_table does the same thing in bulk with NumPy, for
+workloads with millions of processes
+stream_processes generates an endless stream of processes the same way
 """
 
 __author__ = "Stanislaus Slupecki"
 
 import random
+from array import array
 from cpu_tools import *
 
-def generate_processes():
+def generate_processes(seed=None):
     """
     This function creates a list of 100 Process objects
+    :param seed:
+    Seed for a private random number generator
+    The same seed always gives the same processes
+    Default is to use the shared state of the random module
     :return:
     100 process objects
     """
+    rng = random if seed is None else random.Random(seed)
     processes = []
-    arrival_times = inter_arrival_times_to_arrival_times(generate_inter_arrival_times())
-    for i in range(len(arrival_times) - 1):
-        arrival_time = arrival_times[i]
-        # service time is an int between 2 and 5
-        service_time = generate_service_times(1)
-        new_process = Process(i + 1, service_time, arrival_time)
+    # 100 inter-arrival times give 101 arrival times
+    # the last one has no process to go with it
+    arrival_times = inter_arrival_times_to_arrival_times(generate_inter_arrival_times(rng=rng))[:-1]
+    # service time is an int between 2 and 5
+    service_times = generate_service_times(len(arrival_times), rng=rng)
+    for i in range(len(arrival_times)):
+        new_process = Process(i + 1, service_times[i], arrival_times[i])
         processes.append(new_process)
 
     return processes
-def generate_inter_arrival_times(number=100, min=4, max=8):
+
+def generate_inter_arrival_times(number=100, min=4, max=8, rng=random):
     """
     generate a number of inter arrival times
     between and including the numbers min and max
@@ -39,10 +51,13 @@ def generate_inter_arrival_times(number=100, min=4, max=8):
     The minimum time value
     :param max:
     The maximum time value
+    :param rng:
+    The random number generator to draw from
+    Default is the random module
     :return:
     A list of |number| ints
     """
-    times = [random.randint(min, max) for i in range(number)]
+    times = [rng.randint(min, max) for i in range(number)]
     # generate the list w/ a list comprehension
     return times
 
@@ -72,7 +87,7 @@ def inter_arrival_times_to_arrival_times(inter_arrival_times):
     # return the arrival times
     return arrival_times
 
-def generate_service_times(number=100, min=2, max=5):
+def generate_service_times(number=100, min=2, max=5, rng=random):
     """
     Generate number of service times between and including min and max
     :param number:
@@ -81,17 +96,196 @@ def generate_service_times(number=100, min=2, max=5):
     The minimum time value
     :param max:
     The maximum time value
+    :param rng:
+    The random number generator to draw from
+    Default is the random module
     :return:
     A list of |number| ints
     if |number| is 1, it returns a single int
     """
     if(number < 2):
-        return random.randint(min, max)
+        return rng.randint(min, max)
     else:
-        times = [random.randint(min, max) for i in range(number)]
+        times = [rng.randint(min, max) for i in range(number)]
         # generate the list w/ a list comprehension
         return times
 
+"""
+------------------
+BULK GENERATION
+------------------
+Each distribution takes a NumPy Generator, the number of values to draw,
+and its own keyword parameters, and returns an array of floats or ints
+Add a function to DISTRIBUTIONS to make it available by name
+"""
+
+def uniform_distribution(rng, number, min=4, max=8):
+    """
+    Integers between and including min and max
+    """
+    return rng.integers(min, max, size=number, endpoint=True)
+
+def exponential_distribution(rng, number, mean=6):
+    """
+    Exponentially distributed values with the given mean
+    """
+    return rng.exponential(mean, size=number)
+
+def pareto_distribution(rng, number, shape=2, scale=1):
+    """
+    Pareto (type I) distributed values, no smaller than scale
+    A small shape gives a heavy tail
+    """
+    return (rng.pareto(shape, size=number) + 1) * scale
+
+def empirical_distribution(rng, number, values=(1,), weights=None):
+    """
+    Values resampled from observed data
+    :param values:
+    The observed values
+    :param weights:
+    Optional relative weights for each value
+    """
+    import numpy as np
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+        weights = weights / weights.sum()
+    return rng.choice(np.asarray(values), size=number, p=weights)
+
+DISTRIBUTIONS = {
+    "uniform": uniform_distribution,
+    "exponential": exponential_distribution,
+    "pareto": pareto_distribution,
+    "empirical": empirical_distribution,
+}
+
+def draw_times(rng, number, distribution, params=None, minimum=0):
+    """
+    Draws whole number times from a distribution
+    :param rng:
+    A NumPy Generator
+    :param number:
+    The number of times to draw
+    :param distribution:
+    The name of a distribution in DISTRIBUTIONS, or a function
+    with the same signature
+    :param params:
+    A dict of keyword parameters for the distribution
+    :param minimum:
+    The smallest time allowed
+    :return:
+    An int64 array of |number| times
+    """
+    import numpy as np
+    if not callable(distribution):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError("Unknown distribution: " + str(distribution))
+        distribution = DISTRIBUTIONS[distribution]
+    times = np.asarray(distribution(rng, number, **(params or {})))
+    if times.dtype.kind == "f":
+        times = np.rint(times)
+    return np.maximum(times, minimum).astype(np.int64)
+
+def default_params(inter_arrival_distribution, inter_arrival_params,
+                   service_distribution, service_params):
+    """
+    Fills in the homework's parameters for uniform distributions
+    that weren't given any: inter-arrival times between 4 and 8
+    and service times between 2 and 5
+    :return:
+    The inter-arrival and service time parameters
+    """
+    if inter_arrival_params is None and inter_arrival_distribution == "uniform":
+        inter_arrival_params = {"min": 4, "max": 8}
+    if service_params is None and service_distribution == "uniform":
+        service_params = {"min": 2, "max": 5}
+    return inter_arrival_params, service_params
+
+def generate_process_table(number=100, inter_arrival_distribution="uniform",
+                           inter_arrival_params=None, service_distribution="uniform",
+                           service_params=None, seed=None):
+    """
+    Creates a ProcessTable of |number| processes in a few array operations
+    Defaults match generate_processes: inter-arrival times between 4 and 8
+    and service times between 2 and 5
+    :param number:
+    The number of processes to make
+    :param inter_arrival_distribution:
+    Distribution of the time between arrivals
+    :param inter_arrival_params:
+    Keyword parameters for the inter-arrival distribution
+    :param service_distribution:
+    Distribution of the service times
+    :param service_params:
+    Keyword parameters for the service time distribution
+    :param seed:
+    Seed for the random number generator
+    The same seed always gives the same workload
+    :return:
+    A ProcessTable sorted by arrival time, with ids 1 to |number|
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    inter_arrival_params, service_params = default_params(
+        inter_arrival_distribution, inter_arrival_params, service_distribution, service_params)
+
+    inter_arrival_times = draw_times(rng, number, inter_arrival_distribution, inter_arrival_params)
+    # service times of 0 would never terminate
+    service_times = draw_times(rng, number, service_distribution, service_params, minimum=1)
+
+    # the first process arrives at 0, every other one arrives
+    # one inter-arrival time after the process before it
+    arrival_times = np.zeros(number, dtype=np.int64)
+    np.cumsum(inter_arrival_times[:-1], out=arrival_times[1:])
+
+    return ProcessTable(array("q", np.arange(1, number + 1, dtype=np.int64).tobytes()),
+                        array("q", service_times.tobytes()),
+                        array("q", arrival_times.tobytes()))
+
+def stream_processes(inter_arrival_distribution="uniform", inter_arrival_params=None,
+                     service_distribution="uniform", service_params=None, seed=None,
+                     chunk_size=4096):
+    """
+    Generates processes forever, in order of arrival
+    Times are drawn chunk_size at a time, like generate_process_table,
+    so only one chunk is ever held in memory
+    :param inter_arrival_distribution:
+    Distribution of the time between arrivals
+    :param inter_arrival_params:
+    Keyword parameters for the inter-arrival distribution
+    :param service_distribution:
+    Distribution of the service times
+    :param service_params:
+    Keyword parameters for the service time distribution
+    :param seed:
+    Seed for the random number generator
+    The same seed always gives the same stream
+    :param chunk_size:
+    How many processes to draw at once
+    :return:
+    A generator of Process objects, with ids counting up from 1
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    inter_arrival_params, service_params = default_params(
+        inter_arrival_distribution, inter_arrival_params, service_distribution, service_params)
+
+    next_id = 1
+    # the first process arrives at 0
+    arrival_time = 0
+    while True:
+        inter_arrival_times = draw_times(rng, chunk_size, inter_arrival_distribution,
+                                         inter_arrival_params)
+        service_times = draw_times(rng, chunk_size, service_distribution, service_params,
+                                   minimum=1).tolist()
+        # arrival times of the chunk, then the first one of the next chunk
+        arrival_times = (arrival_time + np.cumsum(inter_arrival_times)).tolist()
+        arrival_times.insert(0, arrival_time)
+        for i in range(chunk_size):
+            yield Process(next_id + i, service_times[i], arrival_times[i])
+        next_id += chunk_size
+        arrival_time = arrival_times[chunk_size]
+
 """
 def main():
 
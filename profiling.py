@@ -0,0 +1,121 @@
+# Per phase profiling for the simulator
+"""
+PhaseProfiler adds up the wall time and call count of each phase of the
+driver loop, and of each instrumented Log, CPU or engine method.
+
+Profiling is off unless a profiler is passed in, e.g. with PROFILE in
+main.py or EventEngine(..., profiler=PhaseProfiler()). When it's off,
+methods aren't wrapped at all and each phase costs one test of a local
+variable, so the loop runs at full speed.
+
+Phases are timed with lap(): each call charges the time since the
+previous lap (or start()) to the named phase. Method times are measured
+separately and overlap the phase times, since methods are called from
+inside phases. The Share column is relative to the total phase time.
+
+Instrumented objects can't be pickled, so don't take snapshots of an
+engine while profiling it.
+"""
+import time
+
+# the phases of the driver loop, in order
+PHASES = ("1. feed", "2. set clock", "3. bookkeeping", "4. context switch decision",
+          "5. execute", "6. recover", "7. termination check")
+
+# methods worth timing on each kind of object
+LOG_METHODS = ("add_entry", "set_enqueue_time", "set_dispatch_time", "set_end_time",
+               "set_block_time", "set_wake_time", "unset_initial_wait_flag")
+CPU_METHODS = ("set_clock", "execute_process", "switch_process", "retrieve_previous_process",
+               "retrieve_blocked_process")
+ENGINE_METHODS = ("next_event_time", "skip_to")
+
+
+class PhaseProfiler:
+    """
+    Accumulates time and call counts per phase and per method
+    """
+    def __init__(self):
+        # name -> total seconds
+        self.times = {}
+        # name -> number of calls
+        self.calls = {}
+        # names that are methods, not loop phases
+        self.methods = set()
+        self.last_time = 0.0
+        self.clock = time.perf_counter
+
+    def start(self):
+        """
+        Marks the start of a loop iteration
+        """
+        self.last_time = self.clock()
+
+    def lap(self, phase):
+        """
+        Charges the time since the last lap to a phase
+        :param phase:
+        The name of the phase that just finished
+        """
+        now = self.clock()
+        self.times[phase] = self.times.get(phase, 0.0) + now - self.last_time
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self.last_time = now
+
+    def instrument(self, obj, method_names, prefix):
+        """
+        Wraps methods of an object so every call is timed
+        Only this object is affected, not its class
+        :param obj:
+        The object to instrument
+        :param method_names:
+        The names of the methods to time
+        :param prefix:
+        Added to the method names in the report, e.g. "Log."
+        """
+        for method_name in method_names:
+            name = prefix + method_name
+            self.methods.add(name)
+            self.times.setdefault(name, 0.0)
+            self.calls.setdefault(name, 0)
+            setattr(obj, method_name, self.wrap(getattr(obj, method_name), name))
+
+    def wrap(self, method, name):
+        """
+        Builds a timing wrapper for a bound method
+        """
+        times = self.times
+        calls = self.calls
+        clock = self.clock
+
+        def wrapper(*args):
+            start = clock()
+            result = method(*args)
+            times[name] += clock() - start
+            calls[name] += 1
+            return result
+        return wrapper
+
+    def report(self, file=None):
+        """
+        Prints the time spent in each phase and method
+        Phases are listed in loop order, methods by total time
+        :param file:
+        Where to write the report
+        Default is whatever sys.stdout is when it's called
+        """
+        phase_total = sum(self.times[name] for name in self.times if name not in self.methods)
+        phases = [name for name in PHASES if name in self.times]
+        phases += sorted(name for name in self.times
+                         if name not in self.methods and name not in PHASES)
+        methods = sorted(self.methods, key=lambda name: -self.times[name])
+
+        print("########################################################################", file=file)
+        print("# Phase / Method                   Calls   Total (s)   Mean (us)  Share", file=file)
+        for name in phases + methods:
+            calls = self.calls[name]
+            total = self.times[name]
+            mean = total / calls * 1e6 if calls else 0.0
+            share = total / phase_total * 100 if phase_total else 0.0
+            print("# " + name.ljust(30) + str(calls).rjust(9) + ("%12.4f" % total)
+                  + ("%12.3f" % mean) + ("%6.1f%%" % share), file=file)
+        print("########################################################################", file=file)
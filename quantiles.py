@@ -0,0 +1,145 @@
+# Streaming quantiles with bounded memory
+"""
+Histogram records whole number values (clock ticks) in log-linear
+buckets, in the style of an HDR histogram.
+
+Values below 2 ** precision_bits get a bucket each, so they are exact.
+Above that, every power of two range is split into
+2 ** (precision_bits - 1) buckets, so a reported quantile is within
+1 / 2 ** (precision_bits - 1) of the true value. With the default of 8
+bits that's under 1%.
+
+Memory depends only on the largest value recorded, never on how many
+values were recorded. Two histograms with the same precision merge by
+adding their bucket counts, so results of parallel runs can be combined.
+"""
+
+# the quantiles Log reports
+PERCENTILES = (50, 95, 99, 99.9)
+
+
+class Histogram:
+    """
+    Log-linear histogram of non negative integers
+    """
+    def __init__(self, precision_bits=8):
+        """
+        Constructor for Histogram
+        :param precision_bits:
+        Values below 2 ** precision_bits are recorded exactly
+        Larger values are within 1 / 2 ** (precision_bits - 1)
+        """
+        self.precision_bits = precision_bits
+        # number of exact buckets
+        self.exact_limit = 1 << precision_bits
+        # buckets per power of two above exact_limit
+        self.half = self.exact_limit >> 1
+        # sparse bucket counts, bucket index -> count
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def bucket_index(self, value):
+        """
+        Finds the bucket a value falls in
+        :param value:
+        A non negative integer
+        :return:
+        The bucket index
+        """
+        if value < self.exact_limit:
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return self.exact_limit + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def bucket_value(self, index):
+        """
+        Gives the value a bucket stands for
+        :param index:
+        A bucket index
+        :return:
+        The middle of the range of values the bucket covers
+        """
+        if index < self.exact_limit:
+            return index
+        shift, offset = divmod(index - self.exact_limit, self.half)
+        shift += 1
+        lowest = (offset + self.half) << shift
+        return lowest + ((1 << shift) - 1) / 2
+
+    def record(self, value, count=1):
+        """
+        Adds a value to the histogram
+        :param value:
+        A non negative integer
+        :param count:
+        How many times to add it
+        """
+        if value < 0:
+            raise ValueError("Histogram values can't be negative: " + str(value))
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Adds every value recorded in another histogram to this one
+        :param other:
+        A Histogram with the same precision
+        """
+        if other.precision_bits != self.precision_bits:
+            raise ValueError("Can only merge histograms with the same precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def get_mean(self):
+        """
+        :return:
+        The exact mean of the recorded values, None if there are none
+        """
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def get_percentile(self, percentile):
+        """
+        Estimates a percentile
+        :param percentile:
+        A number from 0 to 100
+        :return:
+        The estimated value, None if nothing was recorded
+        """
+        if not self.count:
+            return None
+        # the rank of the value we want, counting from 1
+        rank = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                # never report beyond what was actually seen
+                return min(max(self.bucket_value(index), self.min), self.max)
+        return self.max
+
+    def get_percentiles(self, percentiles=PERCENTILES):
+        """
+        Estimates several percentiles at once
+        :param percentiles:
+        An iterable of numbers from 0 to 100
+        :return:
+        A dict of percentile -> estimated value
+        """
+        return {percentile: self.get_percentile(percentile) for percentile in percentiles}
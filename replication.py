@@ -0,0 +1,259 @@
+# Monte Carlo replications with confidence intervals
+"""
+One simulated workload is one random sample. replicate() runs
+independent replications, each on its own generated workload, and
+reports the mean of each metric over the replications with a Student t
+confidence interval.
+
+Replications run in batches over a pool of worker processes. After
+each batch, once min_replications are done, the run stops if the
+half-width of every interval is at or below target_half_width, so only
+as many replications are run as the precision asks for.
+
+Every replication gets its own random stream, spawned from the base
+seed with NumPy's SeedSequence. Replication i always sees the same
+workload for a given seed, and batches are evaluated in order, so the
+results and the stopping point don't depend on the number of workers.
+
+Usage:
+    python replication.py --quantum 10 --context-switch 1 --target-half-width 0.5
+"""
+import argparse
+import math
+import sys
+from multiprocessing import Pool
+from simulation import Simulation, check_settings, livelocks
+
+# per replication metrics, in the order run_replication returns them
+METRICS = ("turnaround_time", "total_wait", "initial_wait")
+
+# two sided Student t critical values, by confidence level and then by
+# degrees of freedom, the last entry of each row is the normal limit
+T_DEGREES_OF_FREEDOM = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12, 15, 20, 25, 30, 40, 60, 120, math.inf)
+T_CRITICAL_VALUES = {
+    0.90: (6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+           1.782, 1.753, 1.725, 1.708, 1.697, 1.684, 1.671, 1.658, 1.645),
+    0.95: (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+           2.179, 2.131, 2.086, 2.060, 2.042, 2.021, 2.000, 1.980, 1.960),
+    0.99: (63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+           3.055, 2.947, 2.845, 2.787, 2.750, 2.704, 2.660, 2.617, 2.576),
+}
+
+# the workload settings shared by every task a worker runs
+# set once per worker by init_worker
+_settings = None
+
+
+def init_worker(settings):
+    """
+    Pool initializer, stores the replication settings in the worker
+    :param settings:
+    A (seed, number of processes, workload params, simulation params) tuple
+    """
+    global _settings
+    _settings = settings
+
+
+def run_replication(index):
+    """
+    Generates a workload and simulates it
+    :param index:
+    The replication number, which picks its random stream
+    :return:
+    The mean of each metric in METRICS over the replication's processes
+    """
+    # imported here since it needs NumPy
+    from numpy.random import SeedSequence
+    from process_generator import generate_process_table
+    seed, number, workload_params, simulation_params = _settings
+    workload = generate_process_table(number, seed=SeedSequence(seed, spawn_key=(index,)),
+                                      **workload_params)
+    log = Simulation(workload, retire_entries=True, **simulation_params).run().log
+    return (log.turnaround_histogram.get_mean(), log.total_wait_histogram.get_mean(),
+            log.initial_wait_histogram.get_mean())
+
+
+def t_critical_value(confidence, degrees_of_freedom):
+    """
+    Looks up the two sided Student t critical value
+    Between table entries, it's interpolated in 1 / degrees of freedom
+    :param confidence:
+    One of the levels in T_CRITICAL_VALUES
+    :param degrees_of_freedom:
+    A positive int
+    :return:
+    The critical value
+    """
+    if confidence not in T_CRITICAL_VALUES:
+        raise ValueError("Confidence must be one of " + str(sorted(T_CRITICAL_VALUES)))
+    values = T_CRITICAL_VALUES[confidence]
+    for i, table_degrees in enumerate(T_DEGREES_OF_FREEDOM):
+        if degrees_of_freedom == table_degrees:
+            return values[i]
+        if degrees_of_freedom < table_degrees:
+            low, high = 1 / T_DEGREES_OF_FREEDOM[i - 1], 1 / table_degrees
+            weight = (low - 1 / degrees_of_freedom) / (low - high)
+            return values[i - 1] + weight * (values[i] - values[i - 1])
+    return values[-1]
+
+
+def confidence_interval(samples, confidence=0.95):
+    """
+    Computes a Student t confidence interval for the mean
+    :param samples:
+    A list of at least 2 numbers
+    :param confidence:
+    One of the levels in T_CRITICAL_VALUES
+    :return:
+    A (mean, half-width) pair
+    """
+    count = len(samples)
+    mean = sum(samples) / count
+    variance = sum((sample - mean) ** 2 for sample in samples) / (count - 1)
+    return mean, t_critical_value(confidence, count - 1) * math.sqrt(variance / count)
+
+
+class ReplicationResult:
+    """
+    The aggregated results of replicate()
+    """
+    def __init__(self, samples, confidence, converged):
+        """
+        Constructor for ReplicationResult
+        :param samples:
+        A dict of metric -> list of per replication means
+        :param confidence:
+        The confidence level of the intervals
+        :param converged:
+        Whether every interval reached the target half-width
+        """
+        self.samples = samples
+        self.confidence = confidence
+        self.converged = converged
+        self.replications = len(samples[METRICS[0]])
+        # metric -> (mean, half-width)
+        self.intervals = {metric: confidence_interval(values, confidence)
+                          for metric, values in samples.items()}
+
+    def printData(self):
+        """
+        Prints the mean and confidence interval of each metric
+        """
+        print("########################################################################")
+        print("# Replications: " + str(self.replications)
+              + (" (converged)" if self.converged else " (target not reached)"))
+        for metric in METRICS:
+            mean, half_width = self.intervals[metric]
+            print("# Mean " + metric.replace("_", " ").title() + ": " + str(round(mean, 4))
+                  + " +/- " + str(round(half_width, 4))
+                  + " (" + str(int(self.confidence * 100)) + "% CI)")
+        print("########################################################################")
+
+
+def replicate(number=100, quantum_time=15, context_switch_time=0, seed=0,
+              target_half_width=None, min_replications=10, max_replications=1000,
+              batch_size=8, confidence=0.95, workers=None, workload_params=None,
+              scheduler=None):
+    """
+    Runs independent replications until the confidence intervals are
+    narrow enough
+    :param number:
+    The number of processes in each replication's workload
+    :param quantum_time:
+    The time quantum for the timer interrupt
+    :param context_switch_time:
+    How long a context switch will take
+    :param seed:
+    The base seed every replication's stream is spawned from
+    :param target_half_width:
+    Stop once every interval's half-width is at most this
+    Default is to run max_replications
+    :param min_replications:
+    Never stop before this many replications
+    :param max_replications:
+    Never run more than this many replications, at least 2
+    :param batch_size:
+    How many replications to run between checks
+    :param confidence:
+    One of the levels in T_CRITICAL_VALUES
+    :param workers:
+    How many worker processes to use
+    Default is one per core
+    :param workload_params:
+    Keyword arguments for process_generator.generate_process_table,
+    such as the distributions
+    :param scheduler:
+    The scheduler to use, see cpu_tools
+    Default is round robin
+    :return:
+    A ReplicationResult
+    """
+    if confidence not in T_CRITICAL_VALUES:
+        raise ValueError("Confidence must be one of " + str(sorted(T_CRITICAL_VALUES)))
+    if max_replications < 2:
+        # a confidence interval needs at least 2 samples
+        raise ValueError("max_replications must be at least 2")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    # a quantum below 1 or a negative context switch time
+    check_settings(quantum_time, context_switch_time)
+    if scheduler is None and livelocks(quantum_time, context_switch_time):
+        raise ValueError("A quantum of " + str(quantum_time) + " with a context switch of "
+                         + str(context_switch_time) + " never finishes")
+    settings = (seed, number, workload_params or {},
+                {"quantum_time": quantum_time, "context_switch_time": context_switch_time,
+                 "scheduler": scheduler})
+    samples = {metric: [] for metric in METRICS}
+    converged = False
+    with Pool(workers, initializer=init_worker, initargs=(settings,)) as pool:
+        done = 0
+        while done < max_replications:
+            batch = range(done, min(done + batch_size, max_replications))
+            for means in pool.map(run_replication, batch):
+                for metric, mean in zip(METRICS, means):
+                    samples[metric].append(mean)
+            done = batch.stop
+            if target_half_width is not None and done >= max(min_replications, 2):
+                converged = all(confidence_interval(values, confidence)[1] <= target_half_width
+                                for values in samples.values())
+                if converged:
+                    break
+    return ReplicationResult(samples, confidence, converged)
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Monte Carlo replications of the simulator")
+    parser.add_argument("--processes", type=int, default=100,
+                        help="number of processes in each replication")
+    parser.add_argument("--quantum", type=int, default=15)
+    parser.add_argument("--context-switch", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0,
+                        help="base seed for the replications")
+    parser.add_argument("--target-half-width", type=float, default=None,
+                        help="stop once every confidence interval is this narrow")
+    parser.add_argument("--min-replications", type=int, default=10)
+    parser.add_argument("--max-replications", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="replications run between convergence checks")
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        choices=sorted(T_CRITICAL_VALUES))
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes, default one per core")
+    args = parser.parse_args(argv)
+
+    try:
+        result = replicate(args.processes, args.quantum, args.context_switch, args.seed,
+                           args.target_half_width, args.min_replications, args.max_replications,
+                           args.batch_size, args.confidence, args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+    result.printData()
+    if args.target_half_width is not None and not result.converged:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# On disk cache of simulation results
+"""
+ResultCache stores SimulationResults on disk, keyed by a hash of the
+workload contents and the configuration, so running the same
+configuration again returns the stored result instead of simulating.
+
+    cache = ResultCache("~/.cache/round_robin")
+    result = cache.run(Simulation(processes, quantum_time=10))
+
+Keys are SHA-256 digests of:
+- the workload's id, service time and arrival time columns, in order
+    of arrival, so the same processes given in another order hit the
+    same entry, as long as processes arriving together keep their order
+- the bursts of any I/O processes
+- the quantum, context switch time, starting clock time, number of
+    cores, queue mode and whether entries are retired
+- the scheduler's class and attributes
+- FORMAT_VERSION, which changes whenever results could change
+
+Each result is one file named after its key. The total size of the
+files is kept under max_bytes by deleting the least recently used ones,
+where a hit counts as a use.
+
+Several processes can share a cache directory. Results are written to
+a temporary file and renamed into place, so a reader sees either a
+whole file or none. A file deleted by another process's eviction is
+just a miss.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from array import array
+from cpu_tools import IOProcess
+
+# bump when a change to the simulator could change stored results
+FORMAT_VERSION = 2
+SUFFIX = ".result"
+
+
+def workload_digest(processes):
+    """
+    Hashes the contents of a workload
+    :param processes:
+    A list of processes, a ProcessTable or a trace_file.TraceReader
+    :return:
+    A hashlib sha256 object holding the workload's columns
+    """
+    if hasattr(processes, "arrival_times"):
+        table = processes.sorted_by_arrival()
+        columns = (table.ids, table.service_times, table.arrival_times)
+        ordered = None
+    else:
+        ordered = sorted(processes, key=lambda a: a.arrival_time)
+        columns = (array("q", [process.id for process in ordered]),
+                   array("q", [process.service_time for process in ordered]),
+                   array("q", [process.arrival_time for process in ordered]))
+    digest = hashlib.sha256()
+    for column in columns:
+        column = array("q", column)
+        # hash the same bytes on every machine
+        if sys.byteorder == "big":
+            column.byteswap()
+        digest.update(len(column).to_bytes(8, "little"))
+        digest.update(column.tobytes())
+    if ordered is not None:
+        for index, process in enumerate(ordered):
+            if isinstance(process, IOProcess):
+                digest.update(repr((index, process.bursts)).encode())
+    return digest
+
+
+def simulation_key(simulation, workload=None):
+    """
+    Computes the cache key of a Simulation
+    :param simulation:
+    A simulation.Simulation
+    :param workload:
+    Optional result of workload_digest for the simulation's workload,
+    so a workload run under many configurations is only hashed once
+    :return:
+    A hex digest
+    """
+    if workload is None:
+        digest = workload_digest(simulation.processes)
+    else:
+        digest = workload.copy()
+    scheduler = simulation.scheduler
+    if scheduler is None:
+        scheduler_config = None
+    else:
+        scheduler_config = (type(scheduler).__name__, sorted(vars(scheduler).items()))
+    config = (FORMAT_VERSION, simulation.quantum_time, simulation.context_switch_time,
+              simulation.clock_time, simulation.cores, simulation.queue_mode,
+              simulation.retire_entries, scheduler_config)
+    digest.update(repr(config).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Size bounded, least recently used cache of SimulationResults,
+    one file per result
+    """
+    def __init__(self, directory, max_bytes=1 << 30):
+        """
+        Constructor for ResultCache
+        :param directory:
+        Where to store results, created if it doesn't exist
+        :param max_bytes:
+        The most disk space the stored results may take
+        """
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key):
+        """
+        :return:
+        The file a key's result is stored in
+        """
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        """
+        Looks up a stored result
+        :param key:
+        A key from simulation_key
+        :return:
+        The SimulationResult, or None on a miss
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                result = pickle.load(file)
+            # mark it as recently used
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return result
+
+    def put(self, key, result):
+        """
+        Stores a result, then evicts old results if the cache is too big
+        :param key:
+        A key from simulation_key
+        :param result:
+        A SimulationResult
+        """
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump(result, file, pickle.HIGHEST_PROTOCOL)
+            # atomic, so readers never see a partly written file
+            os.replace(temporary_path, self.path(key))
+        except BaseException:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used results until the cache
+        fits in max_bytes
+        """
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        files.sort()
+        for mtime, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # another process evicted it first
+                pass
+            total -= size
+
+    def run(self, simulation, workload=None):
+        """
+        Runs a simulation, or returns its stored result
+        :param simulation:
+        A simulation.Simulation
+        :param workload:
+        Optional result of workload_digest for the simulation's workload
+        :return:
+        A SimulationResult
+        """
+        key = simulation_key(simulation, workload)
+        result = self.get(key)
+        if result is None:
+            result = simulation.run()
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        """
+        Deletes every stored result
+        """
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUFFIX):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
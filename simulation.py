@@ -0,0 +1,187 @@
+# Reentrant simulation runs
+"""
+Simulation wraps one workload and configuration. run() simulates it
+and returns a SimulationResult. Nothing is printed and no module level
+state is read or changed, so one process can run any number of
+simulations back to back, or in different threads, without
+re-importing anything.
+
+The workload is copied into a ProcessTable when the Simulation is
+built. Every run builds fresh Process objects from it, so neither the
+caller's processes nor the table are changed by a run, and run() can be
+called again with the same results. Workloads with I/O processes are
+kept as a list instead, which the engines copy for every run.
+
+    simulation = Simulation(processes, quantum_time=10, context_switch_time=1)
+    result = simulation.run()
+    print(result.average_turnaround_time, result.percentiles["total_wait"][99])
+"""
+import copy
+import numbers
+from cpu_tools import *
+from log import *
+from event_engine import EventEngine
+
+
+def livelocks(quantum_time, context_switch_time):
+    """
+    Checks for configurations the driver can never finish
+    If a context switch always completes on a timer interrupt, the new
+    process is switched out again before it executes a single tick
+    :param quantum_time:
+    The time quantum for the timer interrupt
+    :param context_switch_time:
+    How long a context switch will take
+    :return:
+    True if the configuration never makes progress once a process
+    has been preempted, always True for a quantum below 1
+    """
+    if quantum_time < 1:
+        return True
+    return max(context_switch_time, 1) % quantum_time == 0
+
+
+def check_settings(quantum_time, context_switch_time, cores=1):
+    """
+    Checks the settings every engine needs
+    Raises ValueError for a setting that isn't a whole number, a quantum
+    or core count below 1, or a negative context switch time
+    :param quantum_time:
+    The time quantum for the timer interrupt
+    :param context_switch_time:
+    How long a context switch will take
+    :param cores:
+    The number of CPU cores
+    """
+    for name, value, minimum in (("quantum_time", quantum_time, 1),
+                                 ("context_switch_time", context_switch_time, 0),
+                                 ("cores", cores, 1)):
+        if not isinstance(value, numbers.Integral) or isinstance(value, bool):
+            raise ValueError(name + " must be a whole number, not " + repr(value))
+        if value < minimum:
+            raise ValueError(name + " must be at least " + str(minimum) + ", not " + str(value))
+
+
+class SimulationResult:
+    """
+    The results of one Simulation run
+    """
+    def __init__(self, log, utilization=None):
+        """
+        Constructor for SimulationResult
+        :param log:
+        The Log the run recorded its results in
+        :param utilization:
+        Per core utilization, for multi core runs
+        """
+        self.log = log
+        self.number_of_processes = log.number_of_entries
+        self.final_complete_time = log.final_complete_time
+        self.average_turnaround_time = log.get_average_turnaround_time()
+        self.average_service_time = log.get_average_service_time()
+        self.percentiles = log.get_percentiles()
+        self.utilization = utilization
+
+    def get_records(self):
+        """
+        Gives the per process results
+        Empty if the log retired its entries
+        :return:
+        A list of tuples, with the fields in export.FIELDS
+        """
+        return [entry.get_record() for entry in self.log.entries.values()]
+
+    def to_dict(self, records=False):
+        """
+        Gives the results as plain data, e.g. for JSON
+        :param records:
+        Whether to include the per process results
+        :return:
+        A dict
+        """
+        result = {
+            "processes": self.number_of_processes,
+            "final_complete_time": self.final_complete_time,
+            "average_turnaround_time": self.average_turnaround_time,
+            "average_service_time": self.average_service_time,
+            "percentiles": self.percentiles,
+        }
+        if self.utilization is not None:
+            result["utilization"] = self.utilization
+        if records:
+            # imported here so quick runs start faster
+            from export import FIELDS
+            result["records"] = [dict(zip(FIELDS, record)) for record in self.get_records()]
+        return result
+
+
+class Simulation:
+    """
+    One workload and configuration, that can be run any number of times
+    """
+    def __init__(self, processes, quantum_time=15, context_switch_time=0, clock_time=0,
+                 scheduler=None, cores=1, queue_mode="shared", retire_entries=False):
+        """
+        Constructor for Simulation
+        :param processes:
+        A list of processes, a ProcessTable or a trace_file.TraceReader
+        :param quantum_time:
+        The time quantum for the timer interrupt
+        :param context_switch_time:
+        How long a context switch will take
+        :param clock_time:
+        The starting clock time
+        :param scheduler:
+        The scheduler to use, see cpu_tools
+        Default is RoundRobin(quantum_time)
+        :param cores:
+        The number of CPU cores, more than 1 runs a MultiCoreEngine
+        :param queue_mode:
+        "shared" or "per_core", for multi core runs
+        :param retire_entries:
+        If True, per process results aren't kept, only the averages
+        and percentiles
+        Raises ValueError for invalid settings, see check_settings
+        """
+        check_settings(quantum_time, context_switch_time, cores)
+        if hasattr(processes, "arrival_times"):
+            # column workloads are never modified by a run
+            self.processes = processes
+        elif any(isinstance(process, IOProcess) for process in processes):
+            # I/O bursts don't fit in a ProcessTable, so each run gets copies
+            self.processes = [process.copy() for process in processes]
+        else:
+            self.processes = ProcessTable.from_processes(processes)
+        self.quantum_time = quantum_time
+        self.context_switch_time = context_switch_time
+        self.clock_time = clock_time
+        self.scheduler = scheduler
+        self.cores = cores
+        self.queue_mode = queue_mode
+        self.retire_entries = retire_entries
+
+    def run(self):
+        """
+        Simulates the workload
+        :return:
+        A SimulationResult
+        """
+        if self.scheduler is None and livelocks(self.quantum_time, self.context_switch_time):
+            raise ValueError("A quantum of " + str(self.quantum_time) + " with a context switch of "
+                             + str(self.context_switch_time) + " never finishes")
+        log = Log(retire_entries=self.retire_entries)
+        processes = self.processes
+        # schedulers like MultiLevelFeedbackQueue keep per run state
+        scheduler = copy.deepcopy(self.scheduler)
+        if self.cores > 1:
+            # imported here so single core runs don't need it
+            from multicore import MultiCoreEngine
+            engine = MultiCoreEngine(processes, self.cores, self.quantum_time,
+                                     self.context_switch_time, self.clock_time,
+                                     queue_mode=self.queue_mode, log=log,
+                                     scheduler=scheduler)
+            engine.run()
+            return SimulationResult(log, engine.get_utilization())
+        EventEngine(processes, self.quantum_time, self.context_switch_time,
+                    self.clock_time, log=log, scheduler=scheduler).run()
+        return SimulationResult(log)
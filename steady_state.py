@@ -0,0 +1,247 @@
+# Long runs under sustained load
+"""
+Measures steady state behaviour by simulating an unbounded stream of
+arrivals, such as process_generator.stream_processes(), instead of a
+workload that drains.
+
+- processes are pulled from the stream only when the clock needs them
+- processes that terminate before warmup_time are discarded, so the
+    empty system at the start doesn't bias the results
+- the rest are grouped into batches of batch_size consecutive
+    completions, and only each batch's mean is kept
+- the estimates are the mean of the last `window` batch means, with a
+    Student t confidence interval, which holds if the batches are long
+    enough to be nearly independent. The lag 1 autocorrelation of the
+    batch means is reported to check that
+- the Log retires every entry once its process terminates
+
+So memory depends on the number of processes in the system and the
+window size, never on how long the run is.
+
+Usage:
+    python steady_state.py --warmup 100000 --batch-size 10000 --batches 100
+"""
+import argparse
+from collections import deque
+from cpu_tools import *
+from log import *
+from event_engine import EventEngine
+from online import StreamProcessManager
+from replication import confidence_interval
+from simulation import check_settings, livelocks
+
+# the metrics batches are kept for
+METRICS = ("turnaround_time", "total_wait", "initial_wait")
+
+
+class BatchMeans:
+    """
+    Log exporter that turns finished entries into batch means
+    """
+    def __init__(self, warmup_time=0, batch_size=1000, window=30):
+        """
+        Constructor for BatchMeans
+        :param warmup_time:
+        Entries that end before this clock time are discarded
+        :param batch_size:
+        How many entries go into each batch
+        :param window:
+        How many of the latest batch means to keep
+        """
+        self.warmup_time = warmup_time
+        self.batch_size = batch_size
+        # metric -> the latest batch means, oldest first
+        self.means = {metric: deque(maxlen=window) for metric in METRICS}
+        # totals for the batch being filled
+        self.totals = [0] * len(METRICS)
+        self.count = 0
+        self.batches = 0
+        self.discarded = 0
+
+    def write_entry(self, entry):
+        """
+        Adds a finished Log entry to the current batch
+        :param entry:
+        A Log.Entry
+        """
+        if entry.end_time < self.warmup_time:
+            self.discarded += 1
+            return
+        totals = self.totals
+        totals[0] += entry.turnaround_time
+        totals[1] += entry.total_wait
+        totals[2] += entry.initial_wait
+        self.count += 1
+        if self.count == self.batch_size:
+            for metric, total in zip(METRICS, totals):
+                self.means[metric].append(total / self.batch_size)
+            self.totals = [0] * len(METRICS)
+            self.count = 0
+            self.batches += 1
+
+    def flush(self):
+        """
+        An unfinished batch is never reported
+        """
+        pass
+
+
+def lag_one_autocorrelation(values):
+    """
+    Estimates how much each value depends on the one before it
+    :param values:
+    A sequence of numbers
+    :return:
+    The lag 1 autocorrelation, None if there aren't enough values
+    """
+    count = len(values)
+    if count < 3:
+        return None
+    mean = sum(values) / count
+    variance = sum((value - mean) ** 2 for value in values)
+    if not variance:
+        return 0.0
+    covariance = sum((values[i] - mean) * (values[i + 1] - mean) for i in range(count - 1))
+    return covariance / variance
+
+
+class SteadyStateResult:
+    """
+    Batch means estimates from a steady state run
+    """
+    def __init__(self, batch_means, final_time, confidence):
+        """
+        Constructor for SteadyStateResult
+        :param batch_means:
+        The BatchMeans the run filled
+        :param final_time:
+        The clock time the run stopped at
+        :param confidence:
+        The confidence level of the intervals
+        """
+        self.batches = batch_means.batches
+        self.batch_size = batch_means.batch_size
+        self.discarded = batch_means.discarded
+        self.final_time = final_time
+        self.confidence = confidence
+        self.window = {metric: list(means) for metric, means in batch_means.means.items()}
+        # metric -> (mean, half-width), None with fewer than 2 batches
+        self.intervals = {metric: confidence_interval(means, confidence) if len(means) > 1 else None
+                          for metric, means in self.window.items()}
+        self.autocorrelation = {metric: lag_one_autocorrelation(means)
+                                for metric, means in self.window.items()}
+
+    def printData(self):
+        """
+        Prints the estimate of each metric
+        """
+        print("########################################################################")
+        print("# Batches: " + str(self.batches) + " of " + str(self.batch_size)
+              + " Warmup Discarded: " + str(self.discarded) + " Final Time: " + str(self.final_time))
+        for metric in METRICS:
+            name = metric.replace("_", " ").title()
+            if self.intervals[metric] is None:
+                print("# Mean " + name + ": not enough batches")
+                continue
+            mean, half_width = self.intervals[metric]
+            autocorrelation = self.autocorrelation[metric]
+            print("# Mean " + name + ": " + str(round(mean, 4)) + " +/- " + str(round(half_width, 4))
+                  + " (" + str(int(self.confidence * 100)) + "% CI, lag 1 autocorrelation "
+                  + ("n/a" if autocorrelation is None else str(round(autocorrelation, 3))) + ")")
+        print("########################################################################")
+
+
+def run_steady_state(arrivals, quantum_time=15, context_switch_time=0, warmup_time=0,
+                     batch_size=1000, batches=30, window=30, confidence=0.95, scheduler=None):
+    """
+    Simulates an arrival stream until enough batches are complete
+    :param arrivals:
+    An iterable of processes in order of arrival, usually endless
+    :param quantum_time:
+    The time quantum for the timer interrupt
+    :param context_switch_time:
+    How long a context switch will take
+    :param warmup_time:
+    Processes that terminate before this clock time are discarded
+    :param batch_size:
+    How many completions go into each batch
+    :param batches:
+    Stop once this many batches are complete
+    A finite stream may stop sooner
+    :param window:
+    How many of the latest batch means the estimates use, at least 2
+    :param confidence:
+    One of the levels in replication.T_CRITICAL_VALUES
+    :param scheduler:
+    The scheduler to use, see cpu_tools
+    Default is RoundRobin(quantum_time)
+    :return:
+    A SteadyStateResult
+    Raises ValueError for invalid settings
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    if batches < 1:
+        raise ValueError("batches must be at least 1")
+    if window < 2:
+        # a confidence interval needs at least 2 batch means
+        raise ValueError("window must be at least 2")
+    check_settings(quantum_time, context_switch_time)
+    if scheduler is None and livelocks(quantum_time, context_switch_time):
+        raise ValueError("A quantum of " + str(quantum_time) + " with a context switch of "
+                         + str(context_switch_time) + " never finishes")
+    batch_means = BatchMeans(warmup_time, batch_size, window)
+    engine = EventEngine((), quantum_time, context_switch_time,
+                         log=Log(batch_means, retire_entries=True), scheduler=scheduler)
+    process_manager = StreamProcessManager(engine.ready_queue)
+    engine.process_manager = process_manager
+    arrivals = iter(arrivals)
+
+    while batch_means.batches < batches and engine.keep_processing:
+        # the next tick needs every arrival up to its clock time
+        while not process_manager.known_until(engine.clock_time):
+            process = next(arrivals, None)
+            if process is None:
+                process_manager.closed = True
+            else:
+                process_manager.receive(process)
+        engine.tick()
+        if engine.keep_processing:
+            engine.skip_to(engine.next_event_time())
+    return SteadyStateResult(batch_means, engine.clock_time, confidence)
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    Simulates process_generator.stream_processes() with the homework's
+    distributions
+    """
+    parser = argparse.ArgumentParser(description="Steady state run with batch means")
+    parser.add_argument("--quantum", type=int, default=15)
+    parser.add_argument("--context-switch", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=10000,
+                        help="clock time before which completions are discarded")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="completions per batch")
+    parser.add_argument("--batches", type=int, default=30,
+                        help="number of batches to run")
+    parser.add_argument("--window", type=int, default=30,
+                        help="number of latest batches the estimates use")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the arrival stream")
+    args = parser.parse_args(argv)
+
+    # imported here since it needs NumPy
+    from process_generator import stream_processes
+    try:
+        result = run_steady_state(stream_processes(seed=args.seed), args.quantum,
+                                  args.context_switch, args.warmup, args.batch_size,
+                                  args.batches, args.window)
+    except ValueError as error:
+        parser.error(str(error))
+    result.printData()
+
+
+if __name__ == "__main__":
+    main()
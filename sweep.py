@@ -0,0 +1,148 @@
+# Parameter sweeps over quantum and context switch time
+"""
+Runs the same workload under every combination of quantum length and
+context switch time, spread over a pool of worker processes.
+
+The workload is handed to each worker once, when the pool starts, as a
+ProcessTable. Tasks only carry the (quantum, context switch) pair, so
+the workload is never pickled per task. Each run builds fresh Process
+objects from the table, so the shared workload is never modified.
+
+With --cache-dir, results are kept in a result_cache.ResultCache, so
+configurations run by an earlier sweep aren't simulated again.
+
+Usage:
+    python sweep.py --quantum 5:30:5 --context-switch 0,1,2 --processes 1000
+"""
+import argparse
+from multiprocessing import Pool
+from cpu_tools import *
+from simulation import Simulation, check_settings, livelocks
+from result_cache import ResultCache, workload_digest
+from cli import check_values, parse_values
+
+# the workload shared by every task a worker runs
+# set once per worker by init_worker
+_workload = None
+# the result cache and the workload's digest, if caching
+_cache = None
+_digest = None
+
+
+def init_worker(workload, cache=None):
+    """
+    Pool initializer, stores the workload in the worker
+    :param workload:
+    A ProcessTable
+    :param cache:
+    Optional ResultCache
+    """
+    global _workload, _cache, _digest
+    _workload = workload
+    _cache = cache
+    if cache is not None:
+        _digest = workload_digest(workload)
+
+
+def run_configuration(config):
+    """
+    Simulates the shared workload under one configuration
+    :param config:
+    A (quantum time, context switch time) pair
+    :return:
+    A (quantum time, context switch time, average turnaround time,
+    average service time) tuple
+    The averages are None if the configuration livelocks
+    """
+    quantum_time, context_switch_time = config
+    if livelocks(quantum_time, context_switch_time):
+        return quantum_time, context_switch_time, None, None
+    simulation = Simulation(_workload, quantum_time, context_switch_time)
+    if _cache is None:
+        result = simulation.run()
+    else:
+        result = _cache.run(simulation, _digest)
+    return (quantum_time, context_switch_time,
+            result.average_turnaround_time, result.average_service_time)
+
+
+def sweep(processes, quantum_times, context_switch_times, workers=None, cache=None):
+    """
+    Simulates a workload under every combination of quantum and
+    context switch time
+    :param processes:
+    A list of processes or a ProcessTable
+    :param quantum_times:
+    An iterable of quantum lengths
+    :param context_switch_times:
+    An iterable of context switch times
+    :param workers:
+    How many worker processes to use
+    Default is one per core
+    :param cache:
+    Optional ResultCache, configurations already in it aren't simulated
+    :return:
+    A list of (quantum time, context switch time, average turnaround time,
+    average service time) tuples, one per configuration, in the order
+    the configurations were given
+    Raises ValueError for an invalid setting, see simulation.check_settings
+    """
+    if not isinstance(processes, ProcessTable):
+        processes = ProcessTable.from_processes(processes)
+    configs = [(quantum_time, context_switch_time)
+               for quantum_time in quantum_times
+               for context_switch_time in context_switch_times]
+    # checked up front, a failure in a worker would take down the whole map
+    for quantum_time, context_switch_time in configs:
+        check_settings(quantum_time, context_switch_time)
+    with Pool(workers, initializer=init_worker, initargs=(processes, cache)) as pool:
+        return pool.map(run_configuration, configs, chunksize=1)
+
+
+def print_table(results, file=None):
+    """
+    Prints sweep results as a tab separated table
+    :param results:
+    The list returned by sweep
+    :param file:
+    Where to write the table
+    Default is whatever sys.stdout is when it's called
+    """
+    print("quantum\tcontext_switch\taverage_turnaround\taverage_service", file=file)
+    for quantum_time, context_switch_time, turnaround, service in results:
+        print(str(quantum_time) + "\t" + str(context_switch_time) + "\t"
+              + ("livelock" if turnaround is None else str(turnaround)) + "\t"
+              + ("livelock" if service is None else str(service)), file=file)
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    Generates a workload with process_generator and sweeps it
+    """
+    parser = argparse.ArgumentParser(description="Sweep quantum and context switch time")
+    parser.add_argument("--quantum", type=parse_values, default=parse_values("5:30:5"),
+                        help="quantum lengths, e.g. 5,10,15 or 1,5:30:5")
+    parser.add_argument("--context-switch", type=parse_values, default=parse_values("0:2"),
+                        help="context switch times, e.g. 0,1,2 or 0:4")
+    parser.add_argument("--processes", type=int, default=1000,
+                        help="number of processes to generate")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the workload generator")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes, default one per core")
+    parser.add_argument("--cache-dir", default=None,
+                        help="directory to cache results in, default no caching")
+    args = parser.parse_args(argv)
+    check_values(parser, "--quantum", args.quantum, 1)
+    check_values(parser, "--context-switch", args.context_switch, 0)
+
+    # imported here since it needs NumPy
+    from process_generator import generate_process_table
+    workload = generate_process_table(args.processes, seed=args.seed)
+    cache = ResultCache(args.cache_dir) if args.cache_dir else None
+    print_table(sweep(workload, args.quantum, args.context_switch, args.workers, cache))
+
+
+if __name__ == "__main__":
+    main()
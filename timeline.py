@@ -0,0 +1,171 @@
+# Execution timeline of a simulation run
+"""
+Timeline records what the CPU did on every tick as run length encoded
+intervals: a pid, a start time, an end time (exclusive) and a state.
+
+- running: the pid executed
+- cs: a context switch loading the pid
+- idle: the CPU had nothing to do, the pid is NO_PROCESS
+
+Consecutive ticks with the same pid and state share one interval, so a
+run costs a few bytes per interval instead of one record per tick, and
+an event engine records the ticks it skips in one step. The columns
+are packed arrays.
+
+Pass a Timeline to EventEngine, or set TIMELINE_FILE in main.py:
+
+    timeline = Timeline()
+    EventEngine(processes, timeline=timeline).run()
+    timeline.write_binary("run.timeline")
+
+Binary layout, all little endian:
+- 8 bytes: the magic string b"RRTIMEL1"
+- 8 bytes: the number of intervals, as an unsigned int
+- then one column after the other: the starts, ends and pids as signed
+    64 bit ints, and the states as signed 8 bit ints (see STATES)
+"""
+import csv
+import struct
+import sys
+from array import array
+
+MAGIC = b"RRTIMEL1"
+HEADER = struct.Struct("<8sQ")
+# state names, indexed by their code
+STATES = ("idle", "running", "cs")
+IDLE = 0
+RUNNING = 1
+CONTEXT_SWITCH = 2
+# the pid of idle intervals
+NO_PROCESS = -1
+
+
+class Timeline:
+    """
+    Run length encoded intervals of CPU activity, in packed columns
+    """
+    def __init__(self):
+        self.pids = array("q")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.states = array("b")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        """
+        :return:
+        An iterator of (pid, start, end, state name) tuples
+        """
+        for index in range(len(self.starts)):
+            yield (self.pids[index], self.starts[index], self.ends[index],
+                   STATES[self.states[index]])
+
+    def record(self, start, end, state, pid=NO_PROCESS):
+        """
+        Adds the ticks from start up to end
+        They're merged into the last interval if they continue it
+        :param start:
+        The first tick
+        :param end:
+        The tick after the last one
+        :param state:
+        IDLE, RUNNING or CONTEXT_SWITCH
+        :param pid:
+        The process running or being loaded
+        """
+        if end <= start:
+            return
+        last = len(self.starts) - 1
+        if last >= 0 and self.ends[last] == start and self.states[last] == state \
+                and self.pids[last] == pid:
+            self.ends[last] = end
+            return
+        self.pids.append(pid)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.states.append(state)
+
+    def record_cpu(self, start, end, cpu):
+        """
+        Adds ticks where the CPU stays in its current state
+        :param start:
+        The first tick
+        :param end:
+        The tick after the last one
+        :param cpu:
+        A cpu_tools.CPU
+        """
+        if cpu.status == "running":
+            self.record(start, end, RUNNING, cpu.active_process.id)
+        elif cpu.status == "cs":
+            self.record(start, end, CONTEXT_SWITCH, cpu.active_process.id)
+        else:
+            self.record(start, end, IDLE)
+
+    def get_time_in_state(self, state):
+        """
+        :param state:
+        IDLE, RUNNING or CONTEXT_SWITCH
+        :return:
+        The total number of ticks spent in that state
+        """
+        return sum(self.ends[i] - self.starts[i] for i in range(len(self.starts))
+                   if self.states[i] == state)
+
+    def write_csv(self, file):
+        """
+        Writes the intervals as CSV, with a header row
+        :param file:
+        A text file opened for writing, with newline=""
+        """
+        writer = csv.writer(file)
+        writer.writerow(("pid", "start", "end", "state"))
+        writer.writerows(self)
+
+    def write_binary(self, path):
+        """
+        Writes the intervals in the binary layout
+        :param path:
+        The file to write
+        """
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, len(self.starts)))
+            for column in (self.starts, self.ends, self.pids, self.states):
+                if sys.byteorder == "big":
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(file)
+
+    def write(self, path):
+        """
+        Writes the intervals to a file
+        :param path:
+        The file to write, CSV if it ends in .csv and binary otherwise
+        """
+        if str(path).endswith(".csv"):
+            with open(path, "w", newline="") as file:
+                self.write_csv(file)
+        else:
+            self.write_binary(path)
+
+    @classmethod
+    def read_binary(cls, path):
+        """
+        Reads a timeline written by write_binary
+        :param path:
+        The file to read
+        :return:
+        A new Timeline
+        """
+        timeline = cls()
+        with open(path, "rb") as file:
+            magic, count = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(str(path) + " is not a timeline file")
+            for column in (timeline.starts, timeline.ends, timeline.pids, timeline.states):
+                column.fromfile(file, count)
+                if sys.byteorder == "big":
+                    column.byteswap()
+        return timeline
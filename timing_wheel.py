@@ -0,0 +1,168 @@
+# Hierarchical timing wheel for processes blocked on I/O
+"""
+TimingWheel holds items until a clock time, like the timer wheels OS
+kernels use for sleeping tasks.
+
+There are LEVELS wheels of SLOTS slots each. Level 0 has one slot per
+tick, level 1 one slot per SLOTS ticks, and so on. An item goes on the
+lowest level whose slot range still holds its expiry time. Items
+further out than the top level are kept in an overflow list.
+
+- schedule() is O(1): the level and slot come from a few shifts
+- advance() only visits occupied slots. Each level keeps a bitmap of
+    its occupied slots, and a slot on a higher level is cascaded down
+    only when the clock reaches its range, so an item moves at most
+    LEVELS times in its life
+- next_expiry() finds the next occupied slot from the bitmaps, so the
+    event engine can skip straight to the next wake up without polling
+    every tick
+
+Items that expire at the same time come out in the order they were
+scheduled.
+"""
+
+# bits of the clock time each level covers
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+SLOT_MASK = SLOTS - 1
+LEVELS = 6
+
+
+def lowest_set_bit(bits):
+    """
+    :return:
+    The index of the lowest set bit of a positive int
+    """
+    return (bits & -bits).bit_length() - 1
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel
+    """
+    def __init__(self, clock_time=0):
+        """
+        Constructor for TimingWheel
+        :param clock_time:
+        The starting clock time
+        """
+        self.now = clock_time
+        # wheels[level][slot] is a list of [expiry time, sequence, item]
+        self.wheels = [[[] for slot in range(SLOTS)] for level in range(LEVELS)]
+        # one bit per occupied slot, for each level
+        self.occupied = [0] * LEVELS
+        # items expiring past the top level
+        self.overflow = []
+        # sequence numbers keep items with the same expiry in order
+        self.sequence = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def schedule(self, expiry_time, item):
+        """
+        Adds an item that expires at a clock time
+        :param expiry_time:
+        A clock time after the wheel's current time
+        :param item:
+        Anything
+        """
+        if expiry_time <= self.now:
+            raise ValueError("Can't schedule at " + str(expiry_time) + ", the wheel is at "
+                             + str(self.now))
+        self.place([expiry_time, self.sequence, item])
+        self.sequence += 1
+        self.count += 1
+
+    def place(self, timer):
+        """
+        Puts a timer on the lowest level that can hold it
+        :param timer:
+        An [expiry time, sequence, item] list
+        """
+        expiry_time = timer[0]
+        # the highest bit where the expiry differs from now picks the level
+        level = max((expiry_time ^ self.now).bit_length() - 1, 0) // SLOT_BITS
+        if level >= LEVELS:
+            self.overflow.append(timer)
+            return
+        slot = (expiry_time >> (level * SLOT_BITS)) & SLOT_MASK
+        self.wheels[level][slot].append(timer)
+        self.occupied[level] |= 1 << slot
+
+    def next_expiry(self):
+        """
+        Finds when the next item expires
+        :return:
+        The earliest expiry time, or None if the wheel is empty
+        """
+        if not self.count:
+            return None
+        now = self.now
+        for level in range(LEVELS):
+            shift = level * SLOT_BITS
+            current = (now >> shift) & SLOT_MASK
+            # on level 0 the current slot holds items due now
+            # higher levels only hold items past the current slot
+            first = current if level == 0 else current + 1
+            bits = self.occupied[level] >> first
+            if bits:
+                slot = first + lowest_set_bit(bits)
+                if level == 0:
+                    return (now & ~SLOT_MASK) | slot
+                return min(timer[0] for timer in self.wheels[level][slot])
+        return min(timer[0] for timer in self.overflow)
+
+    def move_to(self, clock_time):
+        """
+        Moves the wheel's time forward and cascades the slots it enters
+        No item may expire before clock_time
+        :param clock_time:
+        The new time
+        """
+        old = self.now
+        self.now = clock_time
+        if (clock_time >> (LEVELS * SLOT_BITS)) != (old >> (LEVELS * SLOT_BITS)) and self.overflow:
+            overflow = self.overflow
+            self.overflow = []
+            for timer in overflow:
+                self.place(timer)
+        for level in range(LEVELS - 1, 0, -1):
+            shift = level * SLOT_BITS
+            if (clock_time >> shift) == (old >> shift):
+                continue
+            slot = (clock_time >> shift) & SLOT_MASK
+            if self.occupied[level] >> slot & 1:
+                timers = self.wheels[level][slot]
+                self.wheels[level][slot] = []
+                self.occupied[level] &= ~(1 << slot)
+                for timer in timers:
+                    self.place(timer)
+
+    def advance(self, clock_time):
+        """
+        Moves the wheel to a clock time and takes out every item
+        that expires by then
+        :param clock_time:
+        The new time, no earlier than the wheel's current time
+        :return:
+        A list of (expiry time, item) pairs, in order of expiry
+        """
+        expired = []
+        while self.count:
+            expiry_time = self.next_expiry()
+            if expiry_time > clock_time:
+                break
+            self.move_to(expiry_time)
+            slot = expiry_time & SLOT_MASK
+            timers = self.wheels[0][slot]
+            self.wheels[0][slot] = []
+            self.occupied[0] &= ~(1 << slot)
+            timers.sort(key=lambda timer: timer[1])
+            for timer in timers:
+                expired.append((timer[0], timer[2]))
+            self.count -= len(timers)
+        if clock_time > self.now:
+            self.move_to(clock_time)
+        return expired
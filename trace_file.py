@@ -0,0 +1,184 @@
+# Binary trace files for replaying large workloads
+"""
+A trace file holds a workload as fixed width binary records, so it can
+be replayed without building every Process up front.
+
+Layout, all little endian:
+- 8 bytes: the magic string b"RRTRACE1"
+- 8 bytes: the number of records, as an unsigned int
+- one 24 byte record per process: id, arrival time, service time,
+    each a signed 64 bit int
+Records are always stored in order of arrival.
+
+TraceReader memory maps the file. ProcessManager accepts it like a
+ProcessTable and reads one record at a time as processes arrive, so a
+replay starts instantly and the OS only keeps the pages in use.
+
+    write_trace("workload.trace", generate_process_table(10 ** 7))
+    with TraceReader("workload.trace") as trace:
+        log = EventEngine(trace).run()
+"""
+import mmap
+import struct
+import sys
+from array import array
+from cpu_tools import *
+
+MAGIC = b"RRTRACE1"
+HEADER = struct.Struct("<8sQ")
+# fields per record
+RECORD_FIELDS = 3
+
+
+class TraceWriter:
+    """
+    Writes a trace file one process at a time
+    Processes must be written in order of arrival
+    """
+    def __init__(self, path, buffer_size=65536):
+        """
+        Constructor for TraceWriter
+        :param path:
+        The file to write
+        :param buffer_size:
+        How many records to hold before writing them out
+        """
+        self.file = open(path, "wb")
+        # the record count is filled in on close
+        self.file.write(HEADER.pack(MAGIC, 0))
+        self.buffer = array("q")
+        self.buffer_size = buffer_size
+        self.count = 0
+        self.last_arrival_time = None
+
+    def write_process(self, id, arrival_time, service_time):
+        """
+        Adds a record to the trace
+        :param id:
+        The process id
+        :param arrival_time:
+        The process' arrival time
+        :param service_time:
+        The process' service time
+        """
+        if self.last_arrival_time is not None and arrival_time < self.last_arrival_time:
+            raise ValueError("Trace records must be written in order of arrival")
+        self.last_arrival_time = arrival_time
+        self.buffer.extend((id, arrival_time, service_time))
+        self.count += 1
+        if len(self.buffer) >= self.buffer_size * RECORD_FIELDS:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes every buffered record
+        """
+        if sys.byteorder == "big":
+            self.buffer.byteswap()
+        self.buffer.tofile(self.file)
+        self.buffer = array("q")
+
+    def close(self):
+        """
+        Writes the remaining records and the header, then closes the file
+        """
+        self.flush()
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, self.count))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_trace(path, processes):
+    """
+    Writes a whole workload to a trace file
+    :param path:
+    The file to write
+    :param processes:
+    A list of processes or a ProcessTable
+    It is sorted by arrival time before writing
+    """
+    with TraceWriter(path) as writer:
+        if isinstance(processes, ProcessTable):
+            table = processes.sorted_by_arrival()
+            for i in range(len(table)):
+                writer.write_process(table.ids[i], table.arrival_times[i], table.service_times[i])
+        else:
+            for process in sorted(processes, key=lambda a: a.arrival_time):
+                writer.write_process(process.id, process.arrival_time, process.service_time)
+
+
+class TraceReader:
+    """
+    Read only, memory mapped view of a trace file
+    It has the same columns as a ProcessTable, but they are read
+    straight from the file
+    """
+    def __init__(self, path):
+        """
+        Constructor for TraceReader
+        :param path:
+        The trace file to read
+        """
+        if sys.byteorder == "big":
+            raise ValueError("TraceReader needs a little endian machine")
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(str(path) + " is not a trace file")
+        records = memoryview(self.map)[HEADER.size:HEADER.size + count * RECORD_FIELDS * 8].cast("q")
+        # strided views into the records, nothing is copied
+        self.ids = records[0::RECORD_FIELDS]
+        self.arrival_times = records[1::RECORD_FIELDS]
+        self.service_times = records[2::RECORD_FIELDS]
+        self.records = records
+
+    def sorted_by_arrival(self):
+        """
+        Trace files are always in order of arrival
+        :return:
+        This reader
+        """
+        return self
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        """
+        Builds the Process stored in a record
+        :param index:
+        The record to read
+        :return:
+        A new Process object
+        """
+        return Process(self.ids[index], self.service_times[index], self.arrival_times[index])
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self[index]
+
+    def close(self):
+        """
+        Unmaps and closes the file
+        Processes already built from it stay valid
+        """
+        for name in ("ids", "arrival_times", "service_times", "records"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()